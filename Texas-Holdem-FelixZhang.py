@@ -92,6 +92,27 @@ def hand_value(hand):
 import time
 import random
 import textwrap
+import collections
+import argparse
+import asyncio
+import cProfile
+import atexit
+import concurrent.futures
+import itertools
+import json
+import math
+import mmap
+import os
+import pstats
+import queue
+import struct
+import sys
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, without it the computer simulates with pure Python
+    np = None
 
 # how big the stake is for small blind
 small_blind = 5
@@ -109,23 +130,82 @@ bluff_chance_after = 0.15
 bluff_chance_whatsoever = 0.2
 # the indented space of outplay on screen terminal
 indenture = 40
+# 'numpy' simulates all Monte Carlo run-outs of a decision as one batch of arrays, 'python' simulates them one by one
+simulation_engine = 'numpy' if np is not None else 'python'
+# how many Monte Carlo simulations a computer player runs per decision, for each engine
+num_simulation_python = 2000
+num_simulation_numpy = 100000
+# how many simulations make one chunk of work, for each engine
+python_chunk_size = 250
+numpy_chunk_size = 10000
+# how the unknown cards are drawn in a simulation: 'plain' independently, 'stratified' so every chunk gives each
+# possible next table card its share, 'quasi' along a randomly shifted low-discrepancy (Kronecker) sequence
+sampling = 'quasi'
+# how many processes share the simulations of a decision (1 = simulate in this process)
+num_workers = 1
+# the process pool shared by all decisions, started on first use
+pool = None
+# a computer player may stop simulating once the winning rate is known well enough for its decision: after at least
+# this many samples, checked every chunk of this size, with a confidence interval of this many standard errors
+adaptive_stopping = True
+adaptive_min_samples = 200
+adaptive_chunk_python = 100
+adaptive_chunk_numpy = 2000
+adaptive_z = 2.58
+# below this winning rate a computer player just calls
+raise_threshold = 0.5
+# below each of these winning rates it raises a random 1 to N tenths of the pot, above the last one always 10 tenths
+raise_bands = [(0.6, 3), (0.65, 5), (0.7, 7), (0.75, 9), (0.8, 11), (0.85, 13), (0.9, 16), (0.95, 19)]
+raise_top = 10
+# the constants above that make the style of a computer player, which --tune searches and strategy.json overrides
+strategy_names = ('bluff_chance', 'bluff_chance_increase', 'bluff_chance_cap', 'bluff_chance_after',
+                  'bluff_chance_whatsoever', 'raise_threshold', 'raise_bands', 'raise_top')
+# how many seconds a computer player may think about a winning rate (None = until its simulations are done)
+decision_time_budget = None
+# the computer players of a table share one batch of simulations per street, instead of running one each
+shared_equity = True
+# while the human thinks, the computer players already work out their winning rates in the background
+speculative_equity = True
+# how many situations the equity cache remembers before it forgets the least recently used one
+equity_cache_size = 4096
+# how many river tables keep the ranking of every pair of down cards on them
+river_ranking_cache_size = 64
+# the computer players count only the opponents still in the hand, instead of always five
+live_opponents = True
+# and take an opponent who raised in the hand to hold one of the best range_top of the hands (by chen_score),
+# any other hand only at range_floor of the weight, once more for every raise (they may be bluffing)
+opponent_ranges = True
+range_top = 0.25
+range_floor = 0.3
 
 
 class Card:
+    __slots__ = ('suit', 'rank', 'id')
     suits = ['♥', '♠', '♦', '♣']
     ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
-
-    def __init__(self, suit, rank):
-        self.suit = suit
-        self.rank = rank
+    interned = {}
+
+    def __new__(cls, suit, rank):  # there are only 52 cards, so Card(suit, rank) always hands out the same one
+        card = cls.interned.get((suit, rank))
+        if card is None:
+            card = object.__new__(cls)
+            card.suit = suit
+            card.rank = rank
+            card.id = cls.suits.index(suit) * 13 + cls.ranks.index(rank)  # 0..51, in the order of a fresh pack
+            cls.interned[(suit, rank)] = card
+        return card
 
     def show(self):
         return f"{self.suit}{self.rank}"
 
 
+# the 52 cards, indexed by their id
+all_cards = [Card(x, y) for x in Card.suits for y in Card.ranks]
+
+
 class Pack:
     def __init__(self):
-        self.cards = [Card(x, y) for x in Card.suits for y in Card.ranks]
+        self.cards = all_cards.copy()
 
     def wash(self):
         random.shuffle(self.cards)
@@ -142,7 +222,8 @@ class Pack:
         for i in range(n):
             l = len(self.cards)
             j = random.randint(0, l - 1)
-            cards_drawn.append(self.cards.pop(j))
+            self.cards[j], self.cards[-1] = self.cards[-1], self.cards[j]  # swap it to the end, so popping is O(1)
+            cards_drawn.append(self.cards.pop())
         return cards_drawn
 
 
@@ -155,102 +236,98 @@ class Person:
         self.ready = False
         self.stake = 0  ### this variable connects to the stakes in the game
         self.down = []
-        self.hand = []
         self.bluff_chance = bluff_chance
+        self.estimate = None  # the last winning rate, with its sample count and standard error
+        self.tracker = None  # the EquityTracker of this hand
+        self.game = None  # the Game this player sits at
+        self.strategy = None  # this player's own style constants, None to follow the module's
+
+    def style(self):
+        return self.strategy if self.strategy is not None else current_strategy()
 
     def fold(self):
-        self.playing = False
-        slow_print(f"{players.index(self) + 1} ", indent=0, ending='')
-        print(f"""{self.name} 弃牌...""")
-        print(indenture * ' ', end='', flush=True)
+        self.game.table.leave(self)
+        self.game.emit('fold', player=self)
         return
 
     def call(self):
-        if self.stake == stake_ready():
+        game = self.game
+        if self.stake == game.stake_ready():
             self.ready = True
-            slow_print(f"{players.index(self) + 1} ", indent=0, ending='')
-            print(f"""{self.name} 过牌...""")
-            print(indenture * ' ', end='', flush=True)
-        elif self.money > (stake_ready() - self.stake):
-            self.money -= (stake_ready() - self.stake)
-            self.stake += (stake_ready() - self.stake)
+            game.emit('check', player=self)
+        elif self.money > (game.stake_ready() - self.stake):
+            game.table.put(self, game.stake_ready() - self.stake)
             self.ready = True
-            slow_print(f"{players.index(self) + 1} ", indent=0, ending='')
-            print(f"""{self.name} 跟注至 ¥{stake_ready()}...""")
-            print(indenture * ' ', end='', flush=True)
+            game.emit('call', player=self, stake=game.stake_ready())
         else:
-            self.stake += self.money
+            amount = self.money
+            game.table.put(self, amount)
             self.ready = True
-            global is_someone_allin
-            is_someone_allin = True
-            slow_print(f"{players.index(self) + 1} ", indent=0, ending='')
-            print(f"""{self.name} 把仅剩的 ¥{self.money}筹码 ALL-IN 了 !""")
-            print(indenture * ' ', end='', flush=True)
-            self.money = 0
+            game.is_someone_allin = True
+            game.emit('allin', player=self, amount=amount)
             self.is_allin = True
         return
 
     def rise(self, amount):
-        if self.money > (stake_ready() - self.stake + amount):
-            self.money -= (stake_ready() - self.stake + amount)
-            self.stake += (stake_ready() - self.stake + amount)
+        game = self.game
+        game.raises[self] = game.raises.get(self, 0) + 1
+        if self.money > (game.stake_ready() - self.stake + amount):
+            game.table.put(self, game.stake_ready() - self.stake + amount)
             self.ready = True
-            slow_print(f"{players.index(self) + 1} ", indent=0, ending='')
-            print(f"""{self.name} 加注了 ¥{amount}...""")
-            print(indenture * ' ', end='', flush=True)
+            game.emit('raise', player=self, amount=amount)
         else:
-            self.stake += self.money
+            amount = self.money
+            game.table.put(self, amount)
             self.ready = True
-            global is_someone_allin
-            is_someone_allin = True
-            slow_print(f"{players.index(self) + 1} ", indent=0, ending='')
-            print(f"""{self.name}把仅剩的 ¥{self.money}筹码 ALL-IN 了 !""")
-            print(indenture * ' ', end='', flush=True)
-            self.money = 0
+            game.is_someone_allin = True
+            game.emit('allin', player=self, amount=amount)
             self.is_allin = True
         return
 
     def decide(self):  ### Algorithm for computer to decide Fold/Call/Rise
-        print(f"{players.index(self) + 1}{self.name} 思考中...", end='', flush=True)
-        if sum_player_stakes() < 20*small_blind:  # in case it's the blind-round, the odds would be too small at the beginning
+        game = self.game
+        strategy = self.style()
+        started = time.perf_counter()
+        game.emit('think', player=self)
+        if game.sum_player_stakes() < 20*small_blind:  # in case it's the blind-round, the odds would be too small at the beginning
             pot = 20*small_blind
-        elif sum_player_stakes() < 40*small_blind:
-            pot = 0.5 * sum_player_stakes() + 20*small_blind
+        elif game.sum_player_stakes() < 40*small_blind:
+            pot = 0.5 * game.sum_player_stakes() + 20*small_blind
         else:
-            pot = sum_player_stakes()
+            pot = game.sum_player_stakes()
         pot_tenth = 5 * int(pot / 50)
-        odds = (stake_ready() - self.stake) / pot
-        wins = winning_rate(self.down, cards_on_table)
-        print('\r' + (20 + indenture) * ' ', flush=True)
-        print(indenture * ' ', end='', flush=True)
+        odds = (game.stake_ready() - self.stake) / pot
+        num_opponents, ranges = game.opponents(self)
+        self.estimate = game.speculation.result(self, (num_opponents, ranges)) if game.speculation is not None else None
+        source = 'speculation'
+        if self.estimate is None and ranges is None:  # the shared batch is dealt against any cards
+            self.estimate = game.shared_estimate(self, odds if adaptive_stopping else None)
+            source = 'shared'
+        if self.estimate is None:
+            source = 'equity'
+            self.estimate = equity(self.down, game.cards_on_table, num_opponents=num_opponents,
+                                   odds=odds if adaptive_stopping else None, time_budget=decision_time_budget,
+                                   strategy=strategy, tracker=self.tracker, ranges=ranges)
+        wins = self.estimate.wins
+        equity_seconds = time.perf_counter() - started
+        game.emit('thought', player=self, estimate=self.estimate)
         is_bluff = False
+        stake_ready, to_call = game.stake_ready(), game.stake_ready() - self.stake
 
         def calculate():
-            if wins < 0.5:  # the threshold for raising
+            if wins < strategy['raise_threshold']:  # the threshold for raising
                 self.call()
-            elif wins < 0.6:
-                self.rise(pot_tenth * random.randint(1, 3))
-            elif wins < 0.65:
-                self.rise(pot_tenth * random.randint(1, 5))
-            elif wins < 0.7:
-                self.rise(pot_tenth * random.randint(1, 7))
-            elif wins < 0.75:
-                self.rise(pot_tenth * random.randint(1, 9))
-            elif wins < 0.8:
-                self.rise(pot_tenth * random.randint(1, 11))
-            elif wins < 0.85:
-                self.rise(pot_tenth * random.randint(1, 13))
-            elif wins < 0.9:
-                self.rise(pot_tenth * random.randint(1, 16))
-            elif wins < 0.95:
-                self.rise(pot_tenth * random.randint(1, 19))
-            else:
-                self.rise(pot_tenth * 10)
+                return
+            for threshold, most in strategy['raise_bands']:
+                if wins < threshold:
+                    self.rise(pot_tenth * random.randint(1, most))
+                    return
+            self.rise(pot_tenth * strategy['raise_top'])
             return
 
         def bluff():
-            if is_someone_allin:
-                if random.random() < bluff_chance_whatsoever:
+            if game.is_someone_allin:
+                if random.random() < strategy['bluff_chance_whatsoever']:
                     self.call()
                 else:
                     if wins > odds or wins > 0.5:
@@ -258,26 +335,26 @@ class Person:
                     else:
                         self.fold()
             else:
-                if random.random() < bluff_chance_whatsoever:
+                if random.random() < strategy['bluff_chance_whatsoever']:
                     self.call()
                 else:
-                    if (stake_ready() - self.stake) <= 50 * small_blind:
+                    if (game.stake_ready() - self.stake) <= 50 * small_blind:
                         self.rise(pot_tenth * random.randint(1, 10))  # how much to bluff...
-                    elif (stake_ready() - self.stake) <= 100 * small_blind:
+                    elif (game.stake_ready() - self.stake) <= 100 * small_blind:
                         self.call()
-                    elif (stake_ready() - self.stake) > 100 * small_blind:
+                    elif (game.stake_ready() - self.stake) > 100 * small_blind:
                         if wins <= odds:
                             self.fold()
                         else:
                             self.call()
             return
 
-        if (n_bet_round == 1 and random.random() < self.bluff_chance) or (
-                n_bet_round > 1 and random.random() < bluff_chance_after):  # decide whether to bluff...
+        if (game.n_bet_round == 1 and random.random() < self.bluff_chance) or (
+                game.n_bet_round > 1 and random.random() < strategy['bluff_chance_after']):  # decide whether to bluff...
             is_bluff = True
-            self.bluff_chance += bluff_chance_increase
-            if self.bluff_chance > bluff_chance_cap:
-                self.bluff_chance = bluff_chance_cap
+            self.bluff_chance += strategy['bluff_chance_increase']
+            if self.bluff_chance > strategy['bluff_chance_cap']:
+                self.bluff_chance = strategy['bluff_chance_cap']
         else:
             pass
 
@@ -285,7 +362,7 @@ class Person:
             bluff()
         elif not is_bluff:  # now the computer player will use monte-carlo simulation to decide...
             if wins >= odds:
-                if is_someone_allin:
+                if game.is_someone_allin:
                     self.call()
                 else:
                     calculate()
@@ -299,18 +376,28 @@ class Person:
                 else:
                     self.fold()
             else:
-                print('出BUG了！！！')
+                game.emit('bug')
+        if metrics is not None:
+            if not self.playing:
+                action = 'fold'
+            elif self.is_allin:
+                action = 'allin'
+            elif game.stake_ready() > stake_ready:
+                action = 'raise'
+            else:
+                action = 'call' if to_call > 0 else 'check'
+            metrics.record('decision', time.perf_counter() - started, player=self.name,
+                           street=street_names[len(game.cards_on_table)], bluff=is_bluff, action=action, source=source,
+                           wins=wins, samples=self.estimate.samples, stderr=self.estimate.stderr, odds=odds,
+                           to_call=to_call, equity_seconds=equity_seconds)
         return
 
-    def win(self):
-        self.money += sum_player_stakes()
-        time.sleep(2)
-        print("""
-              """)
-        print(indenture * ' ' + '§(*￣▽￣*)§')
-        print(indenture * ' ' + f"{self.name} 赢了!")
-        print(indenture * ' ' + f"{self.name} 拿走了桌上所有的¥{sum_player_stakes()}筹码!")
-        self.playing = False
+    def win(self, amount=None, pot=0, pots=1):  # takes amount, the whole pot if None, as pot of this many pots
+        if amount is None:
+            amount = self.game.sum_player_stakes()
+        self.money += amount
+        self.game.emit('win', player=self, amount=amount, pot=pot, pots=pots)
+        self.game.table.leave(self)
         return
 
 
@@ -326,555 +413,2906 @@ def slow_print(text, indent=indenture, delay=0.2, width=200, ending='\n'):
     return
 
 
-def best_5from7(down, table):
-    best = table
-    for j in range(7):
-        for k in range(6):
-            rand_5 = table + down  # reset the 7 cards
-            rand_5.pop(j)
-            rand_5.pop(k)
-            if hand_value(rand_5) > hand_value(best):
-                best = rand_5
-    return best
+################################################ Fast Hand Evaluator ##############################################################
+# The evaluator works on card ids (Card.id = suit_index * 13 + rank_index), and sets of cards are 52-bit masks.
+# A 7-card hand is scored with table lookups only: each card adds a precomputed key made of a rank weight (high bits)
+# and a count of its suit (3 bits per suit, low 12 bits). The rank weights (borrowed from the SKPokerEval evaluator)
+# give every multiset of 7 ranks a different sum below 7.9 million. Non-flush hands are scored by one lookup on the
+# rank part, flushes by one lookup on the 13-bit rank mask of the flush suit.
+# The score is an int which orders hands exactly like max(hand_value(5 of the 7 cards)) does, including its quirk of
+# valuing the A-2-3-4-5 wheel as an ace-high straight (and the suited wheel as a royal flush).
+rank_weights = [0, 1, 5, 22, 98, 453, 2031, 8698, 22854, 83661, 262349, 636345, 1479181]
+card_keys = [(rank_weights[c % 13] << 12) + (1 << (3 * (c // 13))) for c in range(52)]
+flush_suit_table = [-1] * 4096  # suit-count part of the key -> index of the suit holding 5+ cards, or -1
+rank_count_table = {}  # rank-count part of the key -> score of the best non-flush 5 cards
+flush_table = [0] * 8192  # 13-bit rank mask of the flush suit -> score of the best flush / straight flush
+
+
+def ids_mask(ids):
+    mask = 0
+    for c in ids:
+        mask |= 1 << c
+    return mask
+
+
+def unknown_ids(mask):  # the ids of the cards not in the mask
+    return [c for c in range(52) if not mask >> c & 1]
+
+
+def score_of(category, ranks):  # pack a hand_value-like tuple into one comparable int
+    score = category + 1
+    for i in range(5):
+        score = score * 16 + (ranks[i] if i < len(ranks) else 0)
+    return score
+
+
+def straight_high(mask):  # highest straight in a 13-bit rank mask, valued the way hand_value does, 0 if none
+    if mask & 0b1111100000000 == 0b1111100000000 or mask & 0b1000000001111 == 0b1000000001111:
+        return 14  # broadway, or the wheel which hand_value also calls ace-high
+    for top in range(11, 3, -1):
+        if (mask >> (top - 4)) & 0b11111 == 0b11111:
+            return top + 2
+    return 0
+
+
+def score_rank_counts(counts):
+    present = [r + 2 for r in range(12, -1, -1) if counts[r] > 0]
+    quads = [r + 2 for r in range(12, -1, -1) if counts[r] == 4]
+    trips = [r + 2 for r in range(12, -1, -1) if counts[r] == 3]
+    pairs = [r + 2 for r in range(12, -1, -1) if counts[r] == 2]
+    if quads:
+        return score_of(6, [quads[0], max(r for r in present if r != quads[0])])
+    if trips and (len(trips) > 1 or pairs):
+        return score_of(5, [trips[0], max(trips[1:] + pairs)])
+    high = straight_high(sum(1 << r for r in range(13) if counts[r] > 0))
+    if high:
+        return score_of(3, [high])
+    if trips:
+        return score_of(2, [trips[0]] + [r for r in present if r != trips[0]][:2])
+    if len(pairs) > 1:
+        return score_of(1, pairs[:2] + [max(r for r in present if r not in pairs[:2])])
+    if pairs:
+        return score_of(0, [pairs[0]] + [r for r in present if r != pairs[0]][:3])
+    return score_of(-1, present[:5])
+
+
+def score_flush_mask(mask):
+    high = straight_high(mask)
+    if high:
+        return score_of(8, [14]) if high == 14 else score_of(7, [high])
+    return score_of(4, [r + 2 for r in range(12, -1, -1) if mask >> r & 1][:5])
+
+
+def build_evaluator_tables():
+    for key in range(4096):
+        for s in range(4):
+            if (key >> (3 * s)) & 7 >= 5:
+                flush_suit_table[key] = s
+    for mask in range(8192):
+        if bin(mask).count('1') >= 5:
+            flush_table[mask] = score_flush_mask(mask)
+
+    def fill(r, left, counts, key):  # walk every multiset of 7 ranks with at most 4 cards per rank
+        if r == 13:
+            if left == 0:
+                rank_count_table[key] = score_rank_counts(counts)
+            return
+        for n in range(min(4, left) + 1):
+            counts[r] = n
+            fill(r + 1, left - n, counts, key + n * rank_weights[r])
+        counts[r] = 0
+        return
+
+    fill(0, 7, [0] * 13, 0)
+    return
 
 
-def winning_rate(x_down, y_table_now, num_simulation=2000):
+build_evaluator_tables()
+
+if np is not None:  # the same tables as arrays, for scoring a whole batch of hands at once
+    np_card_keys = np.array(card_keys, dtype=np.int64)
+    np_rank_count_scores = np.array(list(rank_count_table.values()), dtype=np.int64)
+    np_rank_count_index = np.zeros(max(rank_count_table) + 1, dtype=np.uint16)  # rank part -> row of the scores
+    np_rank_count_index[list(rank_count_table)] = np.arange(len(rank_count_table))
+    np_flush_suit_table = np.array(flush_suit_table, dtype=np.int64)
+    np_flush_table = np.array(flush_table, dtype=np.int64)
+
+
+def evaluate_7(ids):  # score 7 card ids, higher is better
+    key = 0
+    for c in ids:
+        key += card_keys[c]
+    s = flush_suit_table[key & 4095]
+    if s < 0:
+        return rank_count_table[key >> 12]
+    mask = 0
+    for c in ids:
+        if c // 13 == s:
+            mask |= 1 << (c % 13)
+    return flush_table[mask]
+
+
+def evaluate_7_numpy(downs, table):  # score down cards of shape (n, h, 2) on tables of shape (n, 5), like evaluate_7
+    keys = np_card_keys[table].sum(axis=1)[:, None] + np_card_keys[downs].sum(axis=2)
+    scores = np_rank_count_scores[np_rank_count_index[keys >> 12]]
+    suits = np_flush_suit_table[keys & 4095]
+    rows, cols = np.nonzero(suits >= 0)
+    if len(rows):  # only the few flush hands need their cards looked at again
+        ids = np.concatenate([downs[rows, cols], table[rows]], axis=1)
+        in_suit = ids // 13 == suits[rows, cols][:, None]
+        masks = np.where(in_suit, 1 << (ids % 13), 0).sum(axis=1)  # ranks within a suit never repeat
+        scores[rows, cols] = np_flush_table[masks]
+    return scores
+
+
+################################################## Equity Cache ##################################################################
+# A bot asks for the same winning rate again on every inter-round of a street, and situations that only differ by a
+# renaming of the suits (♥A♥K on a ♠♦♣ flop and ♦A♦K on a ♠♥♣ flop) have the same winning rate. So the answers are
+# remembered under the canonical form of the situation: the smallest of its 24 suit renamings, with the order of the
+# down cards and of the table cards ignored.
+# A run stopped early (adaptive stopping, a time budget) is remembered too, but marked partial: it answers again only
+# a caller whose decision its samples already settle, and a complete run for the situation replaces it.
+class EquityCache:
+    def __init__(self, size):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.partial = set()  # the keys whose estimate was stopped early
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # the speculation thread fills it while the game reads it
+
+    def get(self, key, settled=None):
+        # settled(estimate): whether a partial estimate is good enough for the caller, None to take complete ones only
+        with self.lock:
+            known = self.entries.get(key)
+            if known is None or key in self.partial and (settled is None or not settled(known)):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return known
+
+    def put(self, key, wins, complete=True):
+        with self.lock:
+            known = self.entries.get(key)
+            if not complete and known is not None and (key not in self.partial or known.samples >= wins.samples):
+                return  # never trade an answer for a less precise one
+            self.entries[key] = wins
+            if complete:
+                self.partial.discard(key)
+            else:
+                self.partial.add(key)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.size:
+                evicted, _ = self.entries.popitem(last=False)  # evict the least recently used situation
+                self.partial.discard(evicted)
+        return
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.partial.clear()
+            self.hits = 0
+            self.misses = 0
+        return
+
+
+equity_cache = EquityCache(equity_cache_size)
+
+
+def canonical_situation(down_ids, table_ids, num_opponents):
+    best = None
+    for perm in itertools.permutations(range(4)):
+        renamed = (tuple(sorted(perm[c // 13] * 13 + c % 13 for c in down_ids)),
+                   tuple(sorted(perm[c // 13] * 13 + c % 13 for c in table_ids)))
+        if best is None or renamed < best:
+            best = renamed
+    return best + (num_opponents,)
+
+
+class Estimate:  # a winning rate together with how it was reached
+    def __init__(self, wins, samples, stderr, seconds=0.0):
+        self.wins = wins
+        self.samples = samples  # how many situations were simulated or enumerated for it, 0 when it was looked up
+        self.stderr = stderr  # its standard error, 0 when it is exact
+        self.seconds = seconds  # how long it took
+
+
+def binomial_stderr(wins, samples):
+    return math.sqrt(wins * (1 - wins) / samples) if samples else 0.0
+
+
+def winning_rate(x_down, y_table_now, num_simulation=None, seed=None, num_opponents=5, time_budget=None):
+    return equity(x_down, y_table_now, num_simulation, seed, num_opponents, time_budget=time_budget).wins
+
+
+def equity(x_down, y_table_now, num_simulation=None, seed=None, num_opponents=5, odds=None, time_budget=None,
+           strategy=None, tracker=None, ranges=None):
+    # odds: stop once the decision taken at these pot odds is settled, by the raise bands of strategy if given
+    # time_budget: return the best estimate reached within this many seconds, or sooner once the simulations are done
+    # tracker: the EquityTracker of the hand, whose samples the simulations build on
+    # ranges: one range per opponent, None for any two cards (then num_opponents is len(ranges))
+    started = time.perf_counter()
+    if ranges is not None:
+        num_opponents = len(ranges)
+    if not y_table_now and num_simulation is None and ranges is None:  # the blind round may be in the table
+        wins = preflop_equity(x_down, num_opponents)
+        if wins is not None:
+            return recorded_equity(Estimate(wins, 0, binomial_stderr(wins, preflop_table_simulations)), 'preflop-table',
+                                   started, len(y_table_now), num_opponents)
+    down_ids = [c.id for c in x_down]
+    table_ids = [c.id for c in y_table_now]
+    stops = []
+    settled = None
+    if odds is not None:
+        boundaries = decision_boundaries(odds, strategy)
+        stops.append(lambda wins, samples: decision_settled(wins, samples, boundaries))
+        settled = lambda known: decision_settled(round(known.wins * known.samples), known.samples, boundaries)
+    key = None
+    if num_simulation is None and seed is None:  # only a default decision may be answered again
+        key = canonical_situation(down_ids, table_ids, num_opponents)
+        if ranges is not None:  # the ranges don't tell the suits apart, so they go with any renaming of the cards
+            key += (tuple(sorted(ranges, key=lambda r: -1 if r is None else hash(r))),)
+        known = equity_cache.get(key, settled)
+        if known is not None:
+            return recorded_equity(Estimate(known.wins, 0, known.stderr), 'cache', started, len(table_ids),
+                                   num_opponents)
+    if time_budget is not None:
+        deadline = started + time_budget
+        stops.append(lambda wins, samples: time.perf_counter() >= deadline)
+    stop = (lambda wins, samples: any(f(wins, samples) for f in stops)) if stops else None
+    prior, tally = (0, 0), None
+    opponents = (num_opponents, ranges)
+    if tracker is not None:
+        prior, tally = tracker.prior(table_ids, opponents), tracker.tally(table_ids, opponents)
+    estimate = estimate_equity(down_ids, table_ids, num_opponents, num_simulation, seed, stop, prior=prior, tally=tally,
+                               ranges=ranges)
+    estimate.seconds = time.perf_counter() - started
+    if tracker is not None:
+        tracker.record(table_ids, opponents, estimate, tally)
+    if key is not None:  # an early stop only answers the decisions it settles
+        equity_cache.put(key, estimate, complete=stop is None or estimate.stderr == 0)
+    return recorded_equity(estimate, 'simulated' if ranges is None else 'ranges', started, len(table_ids),
+                           num_opponents, prior=prior[1], adaptive=stop is not None)
+
+
+def recorded_equity(estimate, source, started, table_size, num_opponents, **fields):  # told to the metrics, if on
+    if metrics is not None:
+        metrics.record('equity', time.perf_counter() - started, source=source, street=street_names[table_size],
+                       opponents=num_opponents, wins=estimate.wins, samples=estimate.samples, stderr=estimate.stderr,
+                       **fields)
+    return estimate
+
+
+def decision_boundaries(odds, strategy=None):  # the winning rates at which Person.decide() changes its mind
+    if strategy is None:
+        strategy = current_strategy()
+    return [strategy['raise_threshold']] + [threshold for threshold, most in strategy['raise_bands']] + [odds]
+
+
+def decision_settled(wins, samples, boundaries):
+    if samples < adaptive_min_samples:
+        return False
+    p = (wins + 2) / (samples + 4)  # Agresti-Coull, so an estimate of 0 or 1 still gets an interval
+    half_width = adaptive_z * math.sqrt(p * (1 - p) / (samples + 4))
+    return all(p + half_width < b or p - half_width >= b for b in boundaries)
+
+
+def estimate_equity(down_ids, table_ids, num_opponents, num_simulation=None, seed=None, stop=None, prior=(0, 0),
+                    tally=None, ranges=None):
+    # stop(wins, samples) may end the simulations before num_simulation
+    # prior: (wins, samples) already simulated in this situation, which the simulations only top up to num_simulation
+    # tally: [card_wins, card_samples] to count the simulated wins and samples into by the next table card
+    # (both only apply to the simulations by chunks, the exact and stratified runs do better without them)
+    # ranges: one range per opponent (None for any two cards), see Hand Ranges
+    engine = 'numpy' if simulation_engine == 'numpy' and np is not None else 'python'
+    if num_simulation is None:
+        num_simulation = num_simulation_numpy if engine == 'numpy' else num_simulation_python
+    if seed is None:  # every decision draws its own seed from the game's random module
+        seed = random.getrandbits(64)
+    if ranges is not None:
+        return range_equity(engine, down_ids, table_ids, ranges, num_simulation, seed, stop, prior)
+    if len(table_ids) == 5:
+        wins, samples = river_equity(engine, down_ids, table_ids, num_opponents,
+                                     chunk_sizes(engine, num_simulation, stop), seed, stop)
+        return Estimate(wins, samples, 0.0 if river_exact(num_opponents) else binomial_stderr(wins, samples))
+    rest = unknown_ids(ids_mask(down_ids + table_ids))
+    n_table = 5 - len(table_ids)
+    n_boards = math.comb(len(rest), n_table)  # how many ways the table can still end up
+    n_exact = n_boards * math.comb(len(rest) - n_table, 2)  # table endings x down cards of a single opponent
+    # the budget is always cut into the same chunks, and chunk i always draws from the random stream (seed, i),
+    # so the result only depends on the seed, no matter how many processes share the chunks
+    # (exact and stratified runs only pay off when they are not cut short)
+    if num_opponents == 1 and n_exact <= num_simulation * 2 and stop is None:
+        # heads-up on the turn or river, going through every possibility costs less than the simulations would
+        wins, samples, chunks = run_chunks([('exact', down_ids, table_ids + list(ending), 1, n_exact // n_boards,
+                                             seed, i) for i, ending in enumerate(itertools.combinations(rest, n_table))])
+        return Estimate(wins, samples, 0.0)
+    if n_table == 1 and stop is None:
+        # on the turn every river card gets the same share of the simulations, so no river card is over-sampled
+        per_river = -(-num_simulation // n_boards)
+        wins, samples, chunks = run_chunks([(engine, down_ids, table_ids + [river], num_opponents, per_river, seed, i)
+                                            for i, river in enumerate(rest)])
+        return Estimate(wins, samples, strata_stderr(chunks))
+    wins, samples, chunks = run_chunks(((engine, down_ids, table_ids, num_opponents, n, seed, i, sampling,
+                                         tally is not None)
+                                        for i, n in enumerate(chunk_sizes(engine, num_simulation - prior[1], stop))),
+                                       stop, prior, tally)
+    return Estimate(wins, samples, chunks_stderr(chunks))
+
+
+def range_equity(engine, down_ids, table_ids, ranges, num_simulation, seed, stop, prior):
+    rest = unknown_ids(ids_mask(down_ids + table_ids))
+    n_table = 5 - len(table_ids)
+    n_exact = math.comb(len(rest), n_table) * math.comb(len(rest) - n_table, 2)
+    if len(ranges) == 1 and (n_table == 0 or n_exact <= num_simulation * 2 and stop is None):
+        # heads-up, weigh every pair of down cards the opponent may hold on every ending of the table
+        wins, weight = 0, 0
+        for ending in itertools.combinations(rest, n_table):
+            ending_wins, ending_weight = exact_heads_up_range(down_ids, table_ids + list(ending),
+                                                              ranges[0] or [1.0] * len(combos))
+            wins += ending_wins
+            weight += ending_weight
+        return Estimate(wins / weight, n_exact, 0.0)
+    wins, samples, chunks = run_chunks(((engine, down_ids, table_ids, len(ranges), n, seed, i, 'plain', False, ranges)
+                                        for i, n in enumerate(chunk_sizes(engine, num_simulation - prior[1], stop))),
+                                       stop, prior)
+    return Estimate(wins, samples, chunks_stderr(chunks))
+
+
+def chunk_sizes(engine, num_simulation, stop):  # small chunks when the simulations may stop early
+    if stop is None:
+        chunk_size = numpy_chunk_size if engine == 'numpy' else python_chunk_size
+    else:
+        chunk_size = adaptive_chunk_numpy if engine == 'numpy' else adaptive_chunk_python
+    return (min(chunk_size, num_simulation - done) for done in range(0, num_simulation, chunk_size))
+
+
+def run_chunks(chunks, stop=None, prior=(0, 0), tally=None):
+    # run the chunks in order, in waves as wide as the pool when stopping early; stop is always checked after the
+    # same chunks, so even an early stop does not depend on the number of workers
+    # prior: (wins, samples) already simulated in the same situation, counted in as one more chunk
+    # tally: [card_wins, card_samples] to add the tallies of the chunks to, when they are run with tally
+    # returns the winning rate, the samples and the (wins, samples) of every chunk
+    wins, samples = prior
+    done = [prior] if samples else []
+    if stop is not None and done and stop(wins, samples):  # what was known already may settle it
+        return wins / samples, samples, done
+    chunks = iter(chunks)
+    while True:
+        wave = list(chunks) if stop is None else list(itertools.islice(chunks, max(num_workers, 1)))
+        if not wave:
+            break
+        if num_workers > 1:
+            results = simulation_pool().map(simulate_chunk, *zip(*wave))
+        else:
+            results = (simulate_chunk(*chunk) for chunk in wave)
+        for chunk, chunk_wins in zip(wave, results):
+            if tally is not None:
+                chunk_wins, card_wins, card_samples = chunk_wins
+                for c in range(52):
+                    tally[0][c] += card_wins[c]
+                    tally[1][c] += card_samples[c]
+            wins += chunk_wins
+            samples += chunk[4]
+            done.append((chunk_wins, chunk[4]))
+            if stop is not None:
+                gain = variance_gain(done)  # the stop rule counts the samples a variance-reduced chunk is worth
+                if stop(wins * gain, samples * gain):
+                    return wins / samples, samples, done
+    return wins / samples, samples, done
+
+
+# Every chunk is an independent replicate of the same estimate, whatever the sampling, so the spread of the chunks
+# tells the real standard error, which stratified and quasi-random chunks bring below the binomial one.
+# It takes a few chunks to tell, until then the binomial error stands; and the early stop only believes the gain
+# once it is sure of it, so a lucky spread can't cut a decision short.
+min_replicates = 8
+min_replicates_stop = 20
+
+
+def chunks_stderr(chunks):
+    wins = sum(w for w, n in chunks)
+    samples = sum(n for w, n in chunks)
+    p = wins / samples
+    if len(chunks) < min_replicates:
+        return binomial_stderr(p, samples)
+    spread = sum((w - p * n) ** 2 for w, n in chunks) * len(chunks) / (len(chunks) - 1)
+    return math.sqrt(spread) / samples
+
+
+def strata_stderr(chunks):  # chunks that each stand for an equal share of the possibilities
+    return math.sqrt(sum(binomial_stderr(w / n, n) ** 2 for w, n in chunks)) / len(chunks)
+
+
+def variance_gain(chunks):  # how many plain samples one sample of these chunks is surely worth, at most 4
+    if len(chunks) < min_replicates_stop:
+        return 1.0
+    wins = sum(w for w, n in chunks)
+    samples = sum(n for w, n in chunks)
+    variance = chunks_stderr(chunks) ** 2 * (1 + 2 * math.sqrt(2 / (len(chunks) - 1)))  # ~ its upper 97% bound
+    if variance == 0:
+        return 4.0
+    return min(max(binomial_stderr(wins / samples, samples) ** 2 / variance, 1.0), 4.0)
+
+
+# every engine counts a win as 1 and a split pot as the share of the pot the computer player would get
+def simulate_chunk(engine, down_ids, table_ids, num_opponents, num_simulation, seed, index, sampling='plain',
+                   tally=False, ranges=None):
+    # count the wins of a chunk; with tally, also the wins and samples by the next table card dealt in them,
+    # as (wins, card_wins, card_samples) indexed by card id; with ranges, the opponents hold hands from them
+    if engine == 'exact':
+        return exact_heads_up(down_ids, table_ids)
+    if ranges is not None and engine == 'numpy':
+        return simulate_ranges_numpy(down_ids, table_ids, ranges, num_simulation, np.random.default_rng([seed, index]))
+    if ranges is not None:
+        return simulate_ranges_python(down_ids, table_ids, ranges, num_simulation, random.Random(f"{seed}-{index}"))
+    if engine == 'numpy':
+        return simulate_numpy(down_ids, table_ids, num_opponents, num_simulation, np.random.default_rng([seed, index]),
+                              sampling, tally)
+    return simulate_python(down_ids, table_ids, num_opponents, num_simulation, random.Random(f"{seed}-{index}"),
+                           sampling, tally)
+
+
+def simulate_python(down_ids, table_ids, num_opponents, num_simulation, rng, sampling='plain', tally=False):
+    # nothing is allocated per simulation: the unknown cards are shuffled in place only as deep as they are dealt
+    # (the remaining table cards first, then the opponents' down cards), and every hand is scored from its key
     wins = 0
-    known_cards = x_down + y_table_now
+    card_wins = [0] * 52 if tally else None
+    card_samples = [0] * 52 if tally else None
+    deck = unknown_ids(ids_mask(down_ids + table_ids))  # the cards unknown to the computer
+    n_deck = len(deck)
+    n_table = 5 - len(table_ids)  # how many table cards are still to come
+    n_dealt = n_table + 2 * num_opponents
+    table_key = sum(card_keys[c] for c in table_ids)
+    down_key = card_keys[down_ids[0]] + card_keys[down_ids[1]]
+    rand = rng.random
+    dims = n_dealt if sampling == 'quasi' else n_table
+    coords = deal_coordinates(sampling, dims, num_simulation, rng)  # where the first dims cards are picked from
     for i in range(num_simulation):
-        pack2 = Pack()
-        for j in range(len(known_cards)):  # remove the cards already-known to the computer player
-            for k in range(len(pack2.cards)):
-                if pack2.cards[k].suit == known_cards[j].suit and pack2.cards[k].rank == known_cards[j].rank:
-                    pack2.cards.remove(pack2.cards[k])
-                    break
-        table_final = []
-        if len(y_table_now) == 5:
-            table_final = y_table_now
+        base = i * dims
+        for j in range(dims):
+            r = j + int(coords[base + j] * (n_deck - j))
+            deck[j], deck[r] = deck[r], deck[j]
+        for j in range(dims, n_dealt):
+            r = j + int(rand() * (n_deck - j))
+            deck[j], deck[r] = deck[r], deck[j]
+        key = table_key
+        for j in range(n_table):
+            key += card_keys[deck[j]]
+        hand_key = key + down_key
+        s = flush_suit_table[hand_key & 4095]
+        if s < 0:  # score the best set the computer player has.
+            hand_val = rank_count_table[hand_key >> 12]
         else:
-            table_final.extend(y_table_now)
-            table_final.extend(pack2.rd_draw(5 - len(y_table_now)))  # draw the remaining cards for the table
-        opponent_downs = []
-        for j in range(5):
-            opponent_downs.append(pack2.rd_draw(2))  # draw the down cards of 5 opponents.
-        hand = best_5from7(x_down, table_final)  # find the best set the computer player has.
-        hand_val = hand_value(hand)
-        opponent_hands = [best_5from7(a, table_final) for a in
-                          opponent_downs]  # find the best sets opponent players have
-        opponent_values = [hand_value(b) for b in opponent_hands]
-        oppo_max = max(opponent_values)
+            hand_val = flush_value(s, down_ids[0], down_ids[1], table_ids, deck, n_table)
+        oppo_max = -1
+        n_max = 0
+        for j in range(n_table, n_dealt, 2):  # score the best sets opponent players have
+            hand_key = key + card_keys[deck[j]] + card_keys[deck[j + 1]]
+            s = flush_suit_table[hand_key & 4095]
+            if s < 0:
+                value = rank_count_table[hand_key >> 12]
+            else:
+                value = flush_value(s, deck[j], deck[j + 1], table_ids, deck, n_table)
+            if value > oppo_max:
+                oppo_max = value
+                n_max = 1
+            elif value == oppo_max:
+                n_max += 1
+        share = 0
         if hand_val > oppo_max:  # compare to see if the computer player beats all opponents
+            share = 1
+        elif hand_val == oppo_max:
+            share = 1 / (1 + n_max)
+        wins += share
+        if tally:
+            card_wins[deck[0]] += share
+            card_samples[deck[0]] += 1
+    if tally:
+        return wins, card_wins, card_samples
+    return wins
+
+
+def flush_value(s, a, b, table_ids, deck, n_table):  # score the flush in suit s of down cards a, b on the table
+    mask = 0
+    for c in table_ids:
+        if c // 13 == s:
+            mask |= 1 << (c % 13)
+    for j in range(n_table):
+        if deck[j] // 13 == s:
+            mask |= 1 << (deck[j] % 13)
+    if a // 13 == s:
+        mask |= 1 << (a % 13)
+    if b // 13 == s:
+        mask |= 1 << (b % 13)
+    return flush_table[mask]
+
+
+def exact_heads_up(down_ids, table_ids):  # go through every pair of down cards a single opponent may hold
+    wins = 0
+    hand_val = evaluate_7(down_ids + table_ids)
+    for oppo_down in itertools.combinations(unknown_ids(ids_mask(down_ids + table_ids)), 2):
+        oppo_val = evaluate_7(list(oppo_down) + table_ids)
+        if hand_val > oppo_val:
             wins += 1
-    return wins / num_simulation  # calculate and return the winning rate for the computer player.
-
-
-def player_choose(i):
-    print('')
-    while True:
-        command = input(f"'弃'/'跟'/'加'/'信息'>>>")
-
-        if command == '弃':
-            print(indenture * ' ', end='', flush=True)
-            i.fold()
-            break
-        elif command == '跟':
-            print(indenture * ' ', end='', flush=True)
-            i.call()
+        elif hand_val == oppo_val:
+            wins += 0.5
+    return wins
+
+
+def simulate_numpy(down_ids, table_ids, num_opponents, num_simulation, rng, sampling='plain', tally=False):
+    rest = np.array(unknown_ids(ids_mask(down_ids + table_ids)))
+    n_table = 5 - len(table_ids)
+    n_dealt = n_table + 2 * num_opponents
+    n = num_simulation
+    # deal the remaining table cards first and the down cards of the opponents after
+    coords = None
+    if sampling != 'plain':
+        coords = deal_coordinates_numpy(sampling, n_dealt if sampling == 'quasi' else n_table, n, rng)
+    deck = deal_numpy(rest, n, n_dealt, rng, coords)
+    table_final = np.concatenate([np.broadcast_to(np.array(table_ids, dtype=np.int64), (n, len(table_ids))),
+                                  deck[:, :n_table]], axis=1)
+    downs = np.concatenate([np.broadcast_to(np.array(down_ids), (n, 1, 2)),
+                            deck[:, n_table:n_dealt].reshape(n, num_opponents, 2)], axis=1)
+    values = evaluate_7_numpy(downs, table_final)
+    oppo_max = values[:, 1:].max(axis=1)
+    ties = (values[:, 1:] == values[:, :1]).sum(axis=1)
+    shares = np.where(values[:, 0] > oppo_max, 1, np.where(values[:, 0] == oppo_max, 1 / (1 + ties), 0))
+    if tally:
+        return (float(shares.sum()), np.bincount(deck[:, 0], weights=shares, minlength=52).tolist(),
+                np.bincount(deck[:, 0], minlength=52).tolist())
+    return float(shares.sum())
+
+
+def deal_numpy(rest, n, n_dealt, rng, coords=None):
+    # shuffle the top n_dealt cards of n copies of the unknown cards at once (a partial Fisher-Yates per row),
+    # the first ones picked where coords (a row of n numbers in [0, 1) per card) point, if given
+    deck = np.tile(rest, (n, 1))
+    rows = np.arange(n)
+    for i in range(n_dealt):
+        if coords is not None and i < len(coords):
+            j = i + (coords[i] * (len(rest) - i)).astype(np.int64)
+        else:
+            j = rng.integers(i, len(rest), size=n)
+        picked = deck[rows, j]
+        deck[rows, j] = deck[:, i]
+        deck[:, i] = picked
+    return deck
+
+
+def deal_coordinates(sampling, dims, num_simulation, rng):
+    # the numbers in [0, 1) that pick the first dims cards dealt, dims for each simulation, one after another
+    if dims == 0:
+        return []
+    if sampling == 'stratified':  # the first card is picked from an equal slice of [0, 1) each time
+        coords = []
+        for i in range(num_simulation):
+            coords.append((i + rng.random()) / num_simulation)
+            coords.extend(rng.random() for j in range(1, dims))
+        return coords
+    if sampling == 'quasi':  # the R_d sequence: steps of powers of the d-dimensional golden ratio, shifted at random
+        steps = kronecker_steps(dims)
+        shifts = [rng.random() for _ in range(dims)]
+        return [(shifts[j] + (i + 1) * steps[j]) % 1.0 for i in range(num_simulation) for j in range(dims)]
+    return [rng.random() for _ in range(dims * num_simulation)]
+
+
+def deal_coordinates_numpy(sampling, dims, num_simulation, rng):  # the same, as an array of one row per card
+    if sampling == 'quasi':
+        coords = np.array(kronecker_steps(dims))[:, None] * np.arange(1, num_simulation + 1) + rng.random((dims, 1))
+        coords -= np.floor(coords)  # much faster than % 1.0
+        return coords
+    coords = rng.random((dims, num_simulation))
+    if sampling == 'stratified' and dims:
+        coords[0] = (np.arange(num_simulation) + coords[0]) / num_simulation
+    return coords
+
+
+def kronecker_steps(d):
+    phi = 2.0
+    for _ in range(30):  # the root of x^(d+1) = x + 1
+        phi = (1 + phi) ** (1 / (d + 1))
+    return [phi ** -(j + 1) for j in range(d)]
+
+
+################################################ River Ranking ###################################################################
+# On the river the table is complete, so the value of every pair of down cards on it is fixed. They are all scored
+# once per table (and shared by every player on that table), after which a winning rate is a matter of counting.
+# Against one or two opponents the counting is exact: with S the pairs that lose to the computer player, E the pairs
+# that tie with it and deg_S(c) the number of pairs in S that use card c, two opponents can be dealt disjoint pairs
+# from S in |S|*|S| - sum(deg_S(c)^2) + |S| ordered ways (card removal is exactly the pairs sharing a card).
+# Three opponents are counted exactly too when NumPy is there: the deals where all three pairs are below the player's
+# are, for every pair the first opponent can get, the two-opponent count of the pairs that don't share its cards. Ties
+# are counted by giving a tying pair the weight x instead of 1: the count is then a cubic in x whose coefficient t is
+# the number of deals with t opponents tying, and a deal with t ties wins 1/(t+1), which is the integral of x^t over
+# [0, 1]. So the count is taken at x = 0..3 and integrated.
+# Against more opponents their down cards are still dealt at random, but looked up instead of evaluated.
+river_rankings = EquityCache(river_ranking_cache_size)
+
+
+def river_ranking(table_ids):  # the value of every pair of down cards on this table, indexed by a * 52 + b
+    key = tuple(sorted(table_ids))
+    values = river_rankings.get(key)
+    if values is None:
+        values = [0] * (52 * 52)
+        for a, b in itertools.combinations(unknown_ids(ids_mask(table_ids)), 2):
+            values[a * 52 + b] = values[b * 52 + a] = evaluate_7([a, b] + table_ids)
+        river_rankings.put(key, values)
+    return values
+
+
+def river_ranking_numpy(table_ids):  # river_ranking as an array, made once per table
+    key = (tuple(sorted(table_ids)), 'numpy')
+    values = river_rankings.get(key)
+    if values is None:
+        values = np.array(river_ranking(table_ids))
+        river_rankings.put(key, values)
+    return values
+
+
+def river_exact(num_opponents):  # whether river_equity counts the winning rate instead of sampling it
+    return num_opponents <= 2 or num_opponents == 3 and np is not None
+
+
+def river_three_opponents(values, hand_val, rest):  # the exact winning rate against three opponents, with NumPy
+    cards = np.array(rest)
+    pair_values = values[cards[:, None] * 52 + cards[None, :]]
+    apart = ~np.eye(len(rest), dtype=bool)  # a card can't be paired with itself
+    lower = (pair_values < hand_val) & apart
+    equal = (pair_values == hand_val) & apart
+    a, b = np.nonzero(np.triu(lower | equal, 1))  # the pairs the first opponent can get without beating the player
+    rows = np.arange(len(a))
+    counts = []
+    for x in range(4):
+        w = lower + x * equal.astype(float)
+        deg = w.sum(axis=1)
+        total, squares = w.sum() / 2, (w * w).sum() / 2
+        first = w[a, b]
+        deg_rest = deg[None, :] - w[a] - w[b]  # the degrees once the first pair's cards are gone
+        deg_rest[rows, a] = 0
+        deg_rest[rows, b] = 0
+        total_rest = total - deg[a] - deg[b] + first
+        squares_rest = squares - (w[a] * w[a]).sum(axis=1) - (w[b] * w[b]).sum(axis=1) + first * first
+        counts.append(float((first * (total_rest * total_rest - (deg_rest * deg_rest).sum(axis=1)
+                                      + squares_rest)).sum()))
+    coefficients = np.linalg.solve(np.vander(np.arange(4.0), increasing=True), counts)
+    deals = math.comb(len(rest), 2) * math.comb(len(rest) - 2, 2) * math.comb(len(rest) - 4, 2)
+    return sum(c / (t + 1) for t, c in enumerate(coefficients)) / deals, deals
+
+
+def river_equity(engine, down_ids, table_ids, num_opponents, sizes, seed, stop=None):
+    values = river_ranking(table_ids)
+    hand_val = values[down_ids[0] * 52 + down_ids[1]]
+    rest = unknown_ids(ids_mask(down_ids + table_ids))
+    if num_opponents <= 2:
+        lower, equal = 0, 0
+        lower_deg, equal_deg = [0] * 52, [0] * 52
+        for a, b in itertools.combinations(rest, 2):
+            v = values[a * 52 + b]
+            if v < hand_val:
+                lower += 1
+                lower_deg[a] += 1
+                lower_deg[b] += 1
+            elif v == hand_val:
+                equal += 1
+                equal_deg[a] += 1
+                equal_deg[b] += 1
+        total = math.comb(len(rest), 2)
+        if num_opponents == 1:
+            return (lower + equal / 2) / total, total
+        both_lower = lower * lower - sum(d * d for d in lower_deg) + lower
+        one_equal = equal * lower - sum(d * e for d, e in zip(lower_deg, equal_deg))  # and the other one lower
+        both_equal = equal * equal - sum(e * e for e in equal_deg) + equal
+        total *= math.comb(len(rest) - 2, 2)
+        return (both_lower + one_equal + both_equal / 3) / total, total
+    if np is not None and num_opponents == 3:
+        return river_three_opponents(river_ranking_numpy(table_ids), hand_val, rest)
+    if engine == 'numpy':
+        np_values = river_ranking_numpy(table_ids)
+        np_rest = np.array(rest)
+    wins, samples = 0, 0
+    for i, n in enumerate(sizes):
+        if engine == 'numpy':
+            deck = deal_numpy(np_rest, n, 2 * num_opponents, np.random.default_rng([seed, i]))
+            oppo_values = np_values[deck[:, 0:2 * num_opponents:2] * 52 + deck[:, 1:2 * num_opponents:2]]
+            oppo_max = oppo_values.max(axis=1)
+            ties = (oppo_values == hand_val).sum(axis=1)
+            wins += float(np.where(hand_val > oppo_max, 1, np.where(hand_val == oppo_max, 1 / (1 + ties), 0)).sum())
+        else:
+            rng = random.Random(f"{seed}-{i}")
+            for k in range(n):
+                dealt = rng.sample(rest, 2 * num_opponents)
+                opponent_values = [values[dealt[j] * 52 + dealt[j + 1]] for j in range(0, 2 * num_opponents, 2)]
+                oppo_max = max(opponent_values)
+                if hand_val > oppo_max:
+                    wins += 1
+                elif hand_val == oppo_max:
+                    wins += 1 / (1 + opponent_values.count(hand_val))
+        samples += n
+        if stop is not None and stop(wins, samples):
             break
-        elif command == '加' and (stake_ready() > i.stake or n_bet_round == 1):
-            if is_someone_allin:
-                print("已有玩家ALL IN，无法继续加注")
+    return wins / samples, samples
+
+
+################################################## All-in Odds ###################################################################
+# Once an all-in stops the betting, every hand left is known, and so is how each of them does on every way the table
+# can still end up: at most C(48, 5) = 1712304 endings preflop. With NumPy they are gone through in blocks that share
+# their first card, every hand scored at once from its key; without it, the endings are gone through one by one when
+# there are few, and a fixed sample of them is taken when there are many.
+runout_python_endings = 20000
+
+
+def runout_odds(downs, table_ids):  # for every pair of down cards, the share of the endings it wins alone and ties
+    rest = unknown_ids(ids_mask([c for down in downs for c in down] + table_ids))
+    n_table = 5 - len(table_ids)
+    wins, ties = [0] * len(downs), [0] * len(downs)
+    if np is not None:
+        np_rest = np.array(rest)
+        table_key = sum(card_keys[c] for c in table_ids)
+        # the endings after their first card: those of the cards after it are a tail of the ones after the first
+        tails = combinations_numpy(len(rest) - 1, max(n_table - 1, 0)) + 1
+        for first in range(len(rest) - n_table + 1):
+            if n_table:
+                tail = tails[np.searchsorted(tails[:, 0], first + 1):] if n_table > 1 else tails
+                cards = np.concatenate([np.full((len(tail), 1), rest[first]), np_rest[tail]], axis=1)
             else:
+                cards = np.zeros((1, 0), dtype=np.int64)
+            keys = np.full(len(cards), table_key, dtype=np.int64)
+            for j in range(n_table):
+                keys += np_card_keys[cards[:, j]]
+            values = [runout_scores(keys + card_keys[a] + card_keys[b], [a, b] + table_ids, cards) for a, b in downs]
+            best = values[0]
+            for v in values[1:]:
+                best = np.maximum(best, v)
+            is_best = [v == best for v in values]
+            alone = sum(x.view(np.int8) for x in is_best) == 1
+            for k, x in enumerate(is_best):
+                n_alone = int(np.count_nonzero(x & alone))
+                wins[k] += n_alone
+                ties[k] += int(np.count_nonzero(x)) - n_alone
+            if not n_table:
+                break
+        total = math.comb(len(rest), n_table)
+        return [(w / total, t / total) for w, t in zip(wins, ties)]
+    if math.comb(len(rest), n_table) <= runout_python_endings:
+        endings = itertools.combinations(rest, n_table)
+    else:  # the same sample every time the same hands are all-in
+        rng = random.Random(f"{downs}-{table_ids}")
+        endings = (rng.sample(rest, n_table) for _ in range(runout_python_endings))
+    total = 0
+    for ending in endings:
+        values = [evaluate_7(down + table_ids + list(ending)) for down in downs]
+        best = max(values)
+        n_best = values.count(best)
+        for k, v in enumerate(values):
+            if v == best and n_best == 1:
+                wins[k] += 1
+            elif v == best:
+                ties[k] += 1
+        total += 1
+    return [(w / total, t / total) for w, t in zip(wins, ties)]
+
+
+def runout_scores(keys, known_ids, cards):  # like evaluate_7, for the known cards with each row of cards
+    scores = np_rank_count_scores[np_rank_count_index[keys >> 12]]
+    suits = np_flush_suit_table[keys & 4095]
+    rows = np.nonzero(suits >= 0)[0]
+    if len(rows):  # only the few flushes need their cards looked at again
+        ids = np.concatenate([np.broadcast_to(np.array(known_ids), (len(rows), len(known_ids))), cards[rows]], axis=1)
+        masks = np.where(ids // 13 == suits[rows][:, None], 1 << (ids % 13), 0).sum(axis=1)
+        scores[rows] = np_flush_table[masks]
+    return scores
+
+
+def combinations_numpy(n, k):  # every k of range(n) as the rows of an array, in the order of itertools.combinations
+    rows = np.zeros((1, 0), dtype=np.int64)
+    for j in range(k):
+        low = rows[:, -1] + 1 if j else np.zeros(1, dtype=np.int64)
+        counts = np.maximum(n - k + j + 1 - low, 0)  # leave room for the ones still to come
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows = np.concatenate([np.repeat(rows, counts, axis=0), (np.repeat(low, counts) + offsets)[:, None]], axis=1)
+    return rows
+
+
+################################################ Hand Ranges #####################################################################
+# An opponent who raised is not holding just any two cards. A range gives each of the 1326 pairs of down cards a weight,
+# and the down cards of the opponents are drawn by those weights: from an alias table, two random numbers a draw
+# whatever the weights. Pairs that hold a card the computer player can see are drawn again, and all the opponents
+# are drawn again when two of them share a card, so every deal comes up as often as the product of its weights.
+# The rest of the table then comes from the cards nobody holds.
+combos = list(itertools.combinations(range(52), 2))  # the pairs of down cards, as ranges index them
+combo_index = [0] * (52 * 52)  # a * 52 + b -> index in combos
+for k, (a, b) in enumerate(combos):
+    combo_index[a * 52 + b] = combo_index[b * 52 + a] = k
+combo_masks = [1 << a | 1 << b for a, b in combos]
+if np is not None:
+    np_combos = np.array(combos, dtype=np.int64)
+    np_combo_masks = np.array(combo_masks, dtype=np.int64)  # 52 bits fit
+ranges_cache = {}
+alias_tables = {}
+
+
+def chen_score(a, b):  # Bill Chen's quick preflop strength of two down cards
+    high, low = max(a % 13, b % 13), min(a % 13, b % 13)
+    points = [1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5, 5, 6, 7, 8, 10]  # 2 .. A
+    if high == low:
+        return max(5, 2 * points[high])
+    score = points[high]
+    if a // 13 == b // 13:
+        score += 2
+    gap = high - low - 1
+    score -= [0, 1, 2, 4, 5][min(gap, 4)]
+    if gap <= 1 and high < 10:  # connectors below a queen can still make the high straights
+        score += 1
+    return math.ceil(score)
+
+
+def hand_range(raises):  # the range of an opponent who raised this many times in the hand
+    weights = ranges_cache.get(raises)
+    if weights is None:
+        scores = [chen_score(a, b) for a, b in combos]
+        cut = sorted(scores, reverse=True)[int(len(combos) * range_top) - 1]
+        weights = tuple(1.0 if score >= cut else range_floor ** raises for score in scores)
+        ranges_cache[raises] = weights
+    return weights
+
+
+def alias_table(weights):  # Vose's alias method: draw k, keep it with chance prob[k] or take alias[k] instead
+    table = alias_tables.get(weights)
+    if table is None:
+        n = len(weights)
+        total = sum(weights)
+        scaled = [w * n / total for w in weights]
+        prob, alias = [1.0] * n, list(range(n))
+        small = [k for k in range(n) if scaled[k] < 1]
+        large = [k for k in range(n) if scaled[k] >= 1]
+        while small and large:
+            k, j = small.pop(), large.pop()
+            prob[k], alias[k] = scaled[k], j
+            scaled[j] -= 1 - scaled[k]
+            (small if scaled[j] < 1 else large).append(j)
+        table = (prob, alias)
+        alias_tables[weights] = table
+    return table
+
+
+def simulate_ranges_python(down_ids, table_ids, ranges, num_simulation, rng):
+    # ranges: one range per opponent, None for any two cards
+    wins = 0
+    known = ids_mask(down_ids + table_ids)
+    deck = unknown_ids(known)
+    tables = [alias_table(weights) if weights is not None else None for weights in ranges]
+    rand = rng.random
+    for i in range(num_simulation):
+        while True:  # deal the opponents, all over again whenever two of them share a card
+            used = known
+            hands = []
+            for table in tables:
                 while True:
-                    message = input('您想加注多少¥ ? >>')
-                    try:
-                        a = float(message)
-                        if a % 5 != 0:
-                            print("输入有误!")
-                        else:
-                            break
-                    except ValueError:
-                        print("输入有误!")
-                print(indenture * ' ', end='', flush=True)
-                i.rise(int(message))
+                    k = int(rand() * 1326)
+                    if table is not None and rand() >= table[0][k]:
+                        k = table[1][k]
+                    if not combo_masks[k] & known:
+                        break
+                if combo_masks[k] & used:
+                    break
+                used |= combo_masks[k]
+                hands.append(combos[k])
+            if len(hands) == len(tables):
                 break
-        elif command == '信息':
-            print(info())
+        board = list(table_ids)
+        while len(board) < 5:
+            c = deck[int(rand() * len(deck))]
+            if not used >> c & 1:
+                used |= 1 << c
+                board.append(c)
+        hand_val = evaluate_7(down_ids + board)
+        opponent_values = [evaluate_7([a, b] + board) for a, b in hands]
+        oppo_max = max(opponent_values)
+        if hand_val > oppo_max:
+            wins += 1
+        elif hand_val == oppo_max:
+            wins += 1 / (1 + opponent_values.count(hand_val))
+    return wins
+
+
+def simulate_ranges_numpy(down_ids, table_ids, ranges, num_simulation, rng):
+    # whole deals are drawn in batches, large enough for the share of them that turns out fine
+    n, n_oppo = num_simulation, len(ranges)
+    known = ids_mask(down_ids + table_ids)
+    blocked = (np_combo_masks & known) != 0  # the pairs holding a card the computer player can see
+    tables = [alias_table_numpy(weights) if weights is not None else None for weights in ranges]
+    found = []
+    n_found, n_drawn = 0, 0
+    while n_found < n:
+        m = int((n - n_found) * (n_drawn + 1) / (n_found + 1) * 1.2) + 16
+        k = np.empty((m, n_oppo), dtype=np.int64)
+        for j, table in enumerate(tables):
+            todo = np.arange(m)
+            while len(todo):
+                draw = rng.integers(0, 1326, len(todo))
+                if table is not None:
+                    draw = np.where(rng.random(len(todo)) < table[0][draw], draw, table[1][draw])
+                k[todo, j] = draw
+                todo = todo[blocked[draw]]
+        masks = np_combo_masks[k]
+        k = k[np.bitwise_or.reduce(masks, axis=1) == masks.sum(axis=1)]  # masks only add up to their union if disjoint
+        found.append(k)
+        n_found += len(k)
+        n_drawn += m
+    hands = np.concatenate(found)[:n]
+    cards = np_combos[hands]  # (n, n_oppo, 2)
+    n_table = 5 - len(table_ids)
+    # the first n_table cards of a shuffle that are not held by an opponent
+    deck = deal_numpy(np.array(unknown_ids(known)), n, n_table + 2 * n_oppo, rng)
+    held = np.bitwise_or.reduce(np_combo_masks[hands], axis=1)
+    board = np.take_along_axis(deck, np.argsort((held[:, None] >> deck) & 1, axis=1, kind='stable')[:, :n_table],
+                               axis=1)
+    table_final = np.concatenate([np.broadcast_to(np.array(table_ids, dtype=np.int64), (n, len(table_ids))), board],
+                                 axis=1)
+    downs = np.concatenate([np.broadcast_to(np.array(down_ids), (n, 1, 2)), cards], axis=1)
+    values = evaluate_7_numpy(downs, table_final)
+    oppo_max = values[:, 1:].max(axis=1)
+    ties = (values[:, 1:] == values[:, :1]).sum(axis=1)
+    return float(np.where(values[:, 0] > oppo_max, 1, np.where(values[:, 0] == oppo_max, 1 / (1 + ties), 0)).sum())
+
+
+def alias_table_numpy(weights):
+    table = alias_tables.get((weights, 'numpy'))
+    if table is None:
+        table = tuple(np.array(x) for x in alias_table(weights))
+        alias_tables[(weights, 'numpy')] = table
+    return table
+
+
+def exact_heads_up_range(down_ids, table_ids, weights):  # the weighted wins and the weight of every pair on the table
+    values = river_ranking(table_ids)
+    hand_val = values[down_ids[0] * 52 + down_ids[1]]
+    wins, weight = 0, 0
+    for a, b in itertools.combinations(unknown_ids(ids_mask(down_ids + table_ids)), 2):
+        w = weights[combo_index[a * 52 + b]]
+        v = values[a * 52 + b]
+        weight += w
+        if hand_val > v:
+            wins += w
+        elif hand_val == v:
+            wins += w / 2
+    return wins, weight
+
+
+############################################### Equity Tracker ###################################################################
+# A computer player's samples stay good for the rest of the hand as far as they agree with the cards shown since.
+# Asked again on the same street, all of them still hold; on the turn, the flop samples that dealt the card that
+# came are a fair sample of the turn (about 1 in 47 of them). So the tracker keeps the wins and samples of the
+# player's last situation, with the flop ones also counted by the turn card they dealt, and the next estimate only
+# simulates what is missing on top of them. (The river is enumerated or looked up, and needs no samples.)
+# Samples only hold against the same opponents: their number and ranges, as (num_opponents, ranges).
+class EquityTracker:
+    def __init__(self):
+        self.table_ids = None  # the table of the samples kept
+        self.opponents = None  # and the opponents they were dealt
+        self.wins = 0
+        self.samples = 0
+        self.cards = None  # [card_wins, card_samples] of the flop samples, by the turn card they dealt
+
+    def prior(self, table_ids, opponents):  # the (wins, samples) kept that hold on this table
+        if opponents != self.opponents:
+            return 0, 0
+        if table_ids == self.table_ids:
+            return self.wins, self.samples
+        if self.cards is not None and table_ids[:-1] == self.table_ids:
+            return self.cards[0][table_ids[-1]], self.cards[1][table_ids[-1]]
+        return 0, 0
+
+    def tally(self, table_ids, opponents):  # where the samples on this table are to be counted by the next card
+        if len(table_ids) != 3 or opponents[1] is not None:  # (the samples against ranges are not counted)
+            return None
+        if table_ids != self.table_ids or opponents != self.opponents or self.cards is None:
+            return [[0] * 52, [0] * 52]
+        return [self.cards[0][:], self.cards[1][:]]  # the kept samples are part of the estimate, so add on to them
+
+    def record(self, table_ids, opponents, estimate, tally=None):
+        if not estimate.samples:  # looked up, nothing to keep
+            return
+        if table_ids != self.table_ids or opponents != self.opponents:
+            self.cards = None
+        self.table_ids = list(table_ids)
+        self.opponents = opponents
+        self.wins = estimate.wins * estimate.samples
+        self.samples = estimate.samples
+        if tally is not None:
+            self.cards = tally
+        return
+
+
+############################################# Shared Street Equity ###############################################################
+# The computer players on a street all need their winning rate on the same table, so one batch of run-outs serves
+# them all: every sample deals the rest of the table and then num_opponents + 2 pairs of down cards, each scored once.
+# A player takes the first num_opponents pairs that don't hold one of its own cards (its two cards can spoil at most
+# two pairs), and skips the samples where the table uses one of them. What is left is, for every player, a fair
+# sample of the unknown cards it can't see, while the scoring of the opponents is shared: a street costs
+# num_opponents + 2 + players evaluations per sample instead of (num_opponents + 1) x players.
+# The batch grows a chunk at a time, and chunks computed ahead by the pool wait their turn, so the result never
+# depends on the number of workers. When players stop as soon as their decision is settled, most of them are
+# settled by the first chunk while a few need many more; so only the first chunk is shared then, and a player who
+# needs more samples simulates them on its own, counted together with its shared ones.
+class StreetBatch:
+    def __init__(self, downs, table_ids, num_opponents=5, seed=None):
+        self.engine = 'numpy' if simulation_engine == 'numpy' and np is not None else 'python'
+        self.num_simulation = num_simulation_numpy if self.engine == 'numpy' else num_simulation_python
+        if adaptive_stopping:  # one chunk size for the whole street, so every chunk is the same whoever asks
+            self.chunk_size = adaptive_chunk_numpy if self.engine == 'numpy' else adaptive_chunk_python
+            self.shared_chunks = 1
         else:
-            print("输入有误!")
+            self.chunk_size = numpy_chunk_size if self.engine == 'numpy' else python_chunk_size
+            self.shared_chunks = -(-self.num_simulation // self.chunk_size)
+        self.downs = downs
+        self.table_ids = table_ids
+        self.num_opponents = num_opponents
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.wins = [0] * len(downs)
+        self.samples = [0] * len(downs)
+        self.done = 0  # how many shared chunks are counted
+        self.ahead = []  # shared chunks the pool has already simulated, in order
+        self.own_done = [0] * len(downs)  # how many chunks of its own each player has counted
+
+    def next_chunk(self):
+        if not self.ahead:
+            wave = [(self.engine, self.downs, self.table_ids, self.num_opponents, self.chunk_size, self.seed,
+                     self.done + j) for j in range(min(max(num_workers, 1), self.shared_chunks - self.done))]
+            if num_workers > 1:
+                self.ahead = list(simulation_pool().map(shared_chunk, *zip(*wave)))
+            else:
+                self.ahead = [shared_chunk(*wave[0])]
+        chunk_wins, chunk_samples = self.ahead.pop(0)
+        for k in range(len(self.downs)):
+            self.wins[k] += chunk_wins[k]
+            self.samples[k] += chunk_samples[k]
+        self.done += 1
+        return
+
+    def estimate(self, k, stop=None):  # the winning rate of the k-th pair of downs, once stop(wins, samples) agrees
+        def enough(wins, samples):
+            return samples >= self.num_simulation or (stop is not None and samples > 0 and stop(wins, samples))
+
+        while self.done < self.shared_chunks and not enough(self.wins[k], self.samples[k]):
+            self.next_chunk()
+        if not enough(self.wins[k], self.samples[k]):
+            wins, samples = self.wins[k], self.samples[k]
+            seed = (self.seed + 1 + k) % 2 ** 64  # a stream of its own, apart from the shared chunks
+            chunks = ((self.engine, self.downs[k], self.table_ids, self.num_opponents, self.chunk_size, seed, i,
+                       sampling) for i in itertools.count(self.own_done[k]))
+            own_wins, own_samples, own_chunks = run_chunks(chunks, lambda w, n: enough(wins + w, samples + n))
+            self.wins[k] += own_wins * own_samples
+            self.samples[k] += own_samples
+            self.own_done[k] += own_samples // self.chunk_size
+        wins = self.wins[k] / self.samples[k]
+        return Estimate(wins, self.samples[k], binomial_stderr(wins, self.samples[k]))
+
+
+def shared_chunk(engine, downs, table_ids, num_opponents, num_simulation, seed, index):
+    if engine == 'numpy':
+        return shared_numpy(downs, table_ids, num_opponents, num_simulation, np.random.default_rng([seed, index]))
+    return shared_python(downs, table_ids, num_opponents, num_simulation, random.Random(f"{seed}-{index}"))
+
+
+def shared_python(downs, table_ids, num_opponents, num_simulation, rng):
+    wins, samples = [0] * len(downs), [0] * len(downs)
+    deck = unknown_ids(ids_mask(table_ids))  # the cards none of the players can see for sure
+    n_deck = len(deck)
+    n_table = 5 - len(table_ids)
+    n_slots = num_opponents + 2
+    n_dealt = n_table + 2 * n_slots
+    table_key = sum(card_keys[c] for c in table_ids)
+    rand = rng.random
+    slot_values = [0] * n_slots
+    for i in range(num_simulation):
+        for j in range(n_dealt):
+            r = j + int(rand() * (n_deck - j))
+            deck[j], deck[r] = deck[r], deck[j]
+        key = table_key
+        for j in range(n_table):
+            key += card_keys[deck[j]]
+        for k in range(n_slots):  # score every pair of down cards once
+            a, b = deck[n_table + 2 * k], deck[n_table + 2 * k + 1]
+            hand_key = key + card_keys[a] + card_keys[b]
+            s = flush_suit_table[hand_key & 4095]
+            slot_values[k] = rank_count_table[hand_key >> 12] if s < 0 else flush_value(s, a, b, table_ids, deck, n_table)
+        for p, (a, b) in enumerate(downs):
+            if a in deck[:n_table] or b in deck[:n_table]:
+                continue  # this table can't happen for this player
+            hand_key = key + card_keys[a] + card_keys[b]
+            s = flush_suit_table[hand_key & 4095]
+            hand_val = rank_count_table[hand_key >> 12] if s < 0 else flush_value(s, a, b, table_ids, deck, n_table)
+            oppo_max = -1
+            n_max = 0
+            n_oppo = 0
+            for k in range(n_slots):
+                c, d = deck[n_table + 2 * k], deck[n_table + 2 * k + 1]
+                if c == a or c == b or d == a or d == b:
+                    continue
+                value = slot_values[k]
+                if value > oppo_max:
+                    oppo_max = value
+                    n_max = 1
+                elif value == oppo_max:
+                    n_max += 1
+                n_oppo += 1
+                if n_oppo == num_opponents:
+                    break
+            if hand_val > oppo_max:
+                wins[p] += 1
+            elif hand_val == oppo_max:
+                wins[p] += 1 / (1 + n_max)
+            samples[p] += 1
+    return wins, samples
+
+
+def shared_numpy(downs, table_ids, num_opponents, num_simulation, rng):
+    rest = np.array(unknown_ids(ids_mask(table_ids)))
+    n_table = 5 - len(table_ids)
+    n_slots = num_opponents + 2
+    n_dealt = n_table + 2 * n_slots
+    n, h = num_simulation, len(downs)
+    deck = deal_numpy(rest, n, n_dealt, rng)
+    table_final = np.concatenate([np.broadcast_to(np.array(table_ids, dtype=np.int64), (n, len(table_ids))),
+                                  deck[:, :n_table]], axis=1)
+    slots = deck[:, n_table:n_dealt].reshape(n, n_slots, 2)
+    own = np.broadcast_to(np.array(downs, dtype=np.int64), (n, h, 2))
+    where = np.full((n, 52), n_dealt, dtype=np.int8)  # where each card was dealt, n_dealt if it wasn't
+    where[np.arange(n)[:, None], deck[:, :n_dealt]] = np.arange(n_dealt, dtype=np.int8)
+    own_where = where[:, own[0].ravel()].reshape(n, h, 2)
+    on_table = (own_where < n_table).any(axis=2)  # (n, h)
+    own = np.where(on_table[:, :, None], slots[:, :1], own)  # never score a card twice, these samples are skipped
+    values = evaluate_7_numpy(np.concatenate([own, slots], axis=1), table_final)
+    hand_val, slot_values = values[:, :h], values[:, h:]
+    own_slot = (own_where.astype(np.int64) - n_table) // 2  # the pair each of the player's cards spoils, if any
+    slot_ids = np.arange(n_slots)
+    free = (slot_ids != own_slot[:, :, :1]) & (slot_ids != own_slot[:, :, 1:])  # (n, h, slots)
+    taken = free & (np.cumsum(free, axis=2, dtype=np.int8) <= num_opponents)
+    oppo_values = np.where(taken, slot_values[:, None, :], -1)
+    oppo_max = oppo_values.max(axis=2)
+    valid = ~on_table
+    wins = ((hand_val > oppo_max) & valid).sum(axis=0).astype(np.float64)
+    rows, cols = np.nonzero((hand_val == oppo_max) & valid)  # only the few split pots need counting
+    if len(rows):
+        ties = (oppo_values[rows, cols] == hand_val[rows, cols][:, None]).sum(axis=1)
+        np.add.at(wins, cols, 1 / (1 + ties))
+    return [float(w) for w in wins], [int(c) for c in valid.sum(axis=0)]
+
+
+def simulation_pool():  # the process pool starts once, and every later decision reuses it
+    global pool
+    if pool is None:
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=num_workers)
+        atexit.register(pool.shutdown)
+    return pool
+
+
+############################################### Preflop Equity Table ##############################################################
+# Before the flop the winning rate only depends on the class of the two down cards (a pair, suited or offsuit, 169
+# classes in all) and on the number of opponents. The build step simulates every class against 1 to 9 opponents once
+# and stores the answers as float32 in a small binary file, which the game memory-maps and reads in O(1).
+# File layout: a 16-byte little-endian header (magic, version, classes, opponents, padding, simulations per entry),
+# then the 169 x 9 table row by row.
+preflop_table_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop_equity.bin')
+preflop_header = struct.Struct('<4sHHHHI')
+preflop_magic = b'PFEQ'
+preflop_version = 2  # bump whenever winning_rate starts measuring something different
+preflop_max_opponents = 9
+# how many simulations the build step runs for every entry of the table
+preflop_num_simulation = 200000
+# the memory-mapped table file, opened on first use (False = no usable file, keep simulating)
+preflop_table = None
+# how many simulations stand behind every entry of the opened table
+preflop_table_simulations = 0
+
+
+def preflop_class(down_ids):  # 0..168, laid out like the usual 13 x 13 grid: pairs on the diagonal,
+    r1, r2 = down_ids[0] % 13, down_ids[1] % 13  # suited hands above it and offsuit hands below it
+    high, low = max(r1, r2), min(r1, r2)
+    if down_ids[0] // 13 == down_ids[1] // 13:
+        return low * 13 + high
+    return high * 13 + low
+
+
+def open_preflop_table():
+    global preflop_table
+    global preflop_table_simulations
+    preflop_table = False
+    try:
+        with open(preflop_table_path, 'rb') as f:
+            table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # no table has been built yet
+        return
+    magic, version, classes, opponents, _, simulations = preflop_header.unpack_from(table)
+    if (magic, version, classes, opponents) == (preflop_magic, preflop_version, 169, preflop_max_opponents) and \
+            len(table) == preflop_header.size + 4 * 169 * preflop_max_opponents:
+        preflop_table = table
+        preflop_table_simulations = simulations
     return
 
 
-def go_on():
+def preflop_equity(x_down, num_opponents):  # the stored winning rate, or None if the table can't answer
+    if preflop_table is None:
+        open_preflop_table()
+    if not preflop_table or not 1 <= num_opponents <= preflop_max_opponents:
+        return None
+    entry = preflop_class([c.id for c in x_down]) * preflop_max_opponents + num_opponents - 1
+    return struct.unpack_from('<f', preflop_table, preflop_header.size + 4 * entry)[0]
+
+
+def build_preflop_table(num_simulation=preflop_num_simulation):
+    deck = all_cards
+    representatives = {}  # one pair of down cards for every class
+    for a in range(52):
+        for b in range(a + 1, 52):
+            representatives.setdefault(preflop_class([a, b]), [deck[a], deck[b]])
+    values = []
+    for k in range(169):
+        for n in range(1, preflop_max_opponents + 1):
+            values.append(winning_rate(representatives[k], [], num_simulation, seed=k * 100 + n, num_opponents=n))
+        print(f"\r{k + 1}/169", end='', flush=True)
     print('')
-    while True:
-        message = input("请输入 '好' 来继续游戏>>")
-        if message == '好':
-            break
-    print(indenture * ' ', end='', flush=True)
+    with open(preflop_table_path + '.tmp', 'wb') as f:
+        f.write(preflop_header.pack(preflop_magic, preflop_version, 169, preflop_max_opponents, 0, num_simulation))
+        f.write(struct.pack(f'<{len(values)}f', *values))
+    os.replace(preflop_table_path + '.tmp', preflop_table_path)  # never leave a half-written table behind
     return
 
 
-def still_betting(n):
-    is_still_betting = True
-    still_players = [i for i in players if i.playing]
+######################################## Table Ledger ########################################
+# The chips of a hand, kept up to date as they move: the betting asks for the highest stake, the pot and how many
+# players are still in after every action, and a 10-seat table or a tournament would otherwise go round the table each
+# time. At the showdown the stakes are cut into a main pot and one side pot for every all-in that couldn't match them.
+class Table:
+    def __init__(self, players):
+        self.max_stake = 0  # the stake everyone still in has to match
+        self.pot = 0  # the stakes of all players, folded or not
+        self.active = 0  # how many players are still in the hand
+        self.seats = {}  # player -> index in the order of betting
+        self.reset(players)
+
+    def reset(self, players):  # a new hand, with the players in their new order
+        self.seats = {p: k for k, p in enumerate(players)}
+        self.max_stake = max((p.stake for p in players), default=0)
+        self.pot = sum(p.stake for p in players)
+        self.active = sum(1 for p in players if p.playing)
+        return
 
-    if n == 0 and is_someone_allin:
-        is_still_betting = False
-    elif n != 0 and all((i.stake == stake_ready() or i.is_allin) for i in still_players):
-        is_still_betting = False
-    else:
-        pass
+    def put(self, person, amount):  # person moves amount from their money to their stake
+        person.money -= amount
+        person.stake += amount
+        self.pot += amount
+        if person.stake > self.max_stake:
+            self.max_stake = person.stake
+        return
+
+    def leave(self, person):  # person is out of the hand
+        if person.playing:
+            person.playing = False
+            self.active -= 1
+        return
+
+    def uncalled(self, players):  # (player, amount) of the top stake no one else matched, amount 0 if everyone did
+        stakes = sorted(players, key=lambda p: p.stake, reverse=True)
+        if len(stakes) < 2:
+            return None, 0
+        return stakes[0], stakes[0].stake - stakes[1].stake
+
+    def pots(self, players):  # [(amount, players who can win it)], the main pot first, then the side pots
+        pots = []
+        below = 0
+        for level in sorted({p.stake for p in players if p.playing}):
+            amount = sum(min(p.stake, level) - min(p.stake, below) for p in players)
+            pots.append((amount, [p for p in players if p.playing and p.stake >= level]))
+            below = level
+        if pots:  # the stakes of folded players above every live one go to the last pot
+            pots[-1] = (pots[-1][0] + self.pot - sum(amount for amount, eligible in pots), pots[-1][1])
+        return pots
+
+
+######################################## Game Engine ########################################
+# The game itself, as a state machine that never prints, sleeps or asks: everything that happens at the table is
+# told to the listeners as an event, and whenever the human player has to act the game stops and waits for act().
+# A table of computer players only therefore runs through its hands as fast as they can think.
+class Game:
+    def __init__(self, players, human=None):
+        self.players = players  # in the order of betting, moved clockwise before every hand
+        self.human = human  # the player who acts through act(), None for a table of computer players only
+        self.cards_on_table = []  # the public cards drawn and shown on the table
+        self.n_bet_round = 0  # how many inter-rounds have occurred for a certain street
+        self.is_someone_allin = False
+        self.pack = None
+        self.listeners = []  # called as listener(game, event, data) for every event
+        self.waiting = None  # the player the game is waiting for, None when the hand is over
+        self.flow = None
+        self.raises = {}  # player -> how many times they raised in this hand
+        self.batch = None  # the simulations the computer players share on this street
+        self.batch_players = []
+        self.batch_street = None  # how many table cards the batch was dealt for
+        self.speculation = None  # the background thread that thinks ahead for the computer players, if any
+        self.pack_cards = None  # the ids of the cards of the next hand in the order they come, None to wash a pack
+        self.table = Table(players)  # the stakes, pot and seats, kept as the chips move
+        for i in players:
+            i.game = self
+
+    def emit(self, event, **data):
+        for listener in self.listeners:
+            listener(self, event, data)
+        return
 
-    if len(still_players) == 1:
+    def seat(self, person):
+        return self.table.seats[person] + 1
+
+    def stake_ready(self):
+        return self.table.max_stake
+
+    def sum_player_stakes(self):
+        return self.table.pot
+
+    def active_player_number(self):
+        return self.table.active
+
+    def opponents(self, person):  # (num_opponents, ranges) person is up against, ranges None for any cards
+        # ranges change the answer, and cost its fast paths: the preflop table and the street's shared batch are
+        # dealt against any cards, so once someone raised they are skipped (the equity cache keeps the ranges in its
+        # key and still answers repeated decisions). opponent_ranges = False trades the reads back for the speed.
+        if not live_opponents:
+            return 5, None
+        others = [i for i in self.players if i.playing and i is not person]
+        raises = [self.raises.get(i, 0) for i in others]
+        if not opponent_ranges or not any(raises):
+            return len(others), None
+        return len(others), tuple(hand_range(n) if n else None for n in raises)
+
+    def shared_estimate(self, person, odds=None):  # person's share of the street's batch of simulations, or None
+        if not shared_equity or decision_time_budget is not None or len(self.cards_on_table) not in (3, 4):
+            return None  # the blind round has the preflop table, the river shares one ranking of the table
+        if adaptive_stopping and odds is not None and not (simulation_engine == 'numpy' and np is not None):
+            return None  # sharing one small chunk saves nothing when the samples are simulated one by one
+        num_opponents = self.opponents(person)[0]
+        if self.batch_street != len(self.cards_on_table) or self.batch.num_opponents != num_opponents:
+            bots = [i for i in self.players if i.playing and not i.is_allin and i is not self.human]
+            if len(bots) < 2:
+                return None
+            self.batch = StreetBatch([[c.id for c in i.down] for i in bots], [c.id for c in self.cards_on_table],
+                                     num_opponents)
+            self.batch_players = bots
+            self.batch_street = len(self.cards_on_table)
+        if person not in self.batch_players:
+            return None
+        stop = None
+        if odds is not None:
+            boundaries = decision_boundaries(odds, person.style())
+            stop = lambda wins, samples: decision_settled(wins, samples, boundaries)
+        return self.batch.estimate(self.batch_players.index(person), stop)
+
+    def can_raise(self, person):
+        return (self.stake_ready() > person.stake or self.n_bet_round == 1) and not self.is_someone_allin
+
+    def still_betting(self, n):
         is_still_betting = True
+        still_players = [i for i in self.players if i.playing]
 
-    if len(still_players) == 0:
-        is_still_betting = False
+        if n == 0 and self.is_someone_allin:
+            is_still_betting = False
+        elif n != 0 and all((i.stake == self.stake_ready() or i.is_allin) for i in still_players):
+            is_still_betting = False
+        else:
+            pass
 
-    return is_still_betting
+        if len(still_players) == 1:
+            is_still_betting = True
 
+        if len(still_players) == 0:
+            is_still_betting = False
 
-# define the six players that are about to start the game
-players = []
-# define YOU
-player = Person("")
+        return is_still_betting
 
+    def start_hand(self):  # deal a new hand and play it until the human has to act, or until it is over
+        self.flow = self.play_hand()
+        self.advance(None)
+        return
 
-##################################### The program jumps here when the player starts a new game ##################################
-def new_game():
-    global player
-    global players
-
-    zhao = Person("赵金宝")
-    sun = Person("孙广智")
-    li = Person("李延寿")
-    zhang = Person("张国强")
-    wu = Person("吴家旺")
-    myname = input("""请输入您的大名 >>""")
-    player = Person(myname)
-    players = [zhao, sun, li, zhang, wu, player]
-    random.shuffle(players)  # randomly determine the order of playing
+    def act(self, command, amount=0):  # the human's 'fold', 'call' or 'raise'
+        if self.waiting is None:
+            raise ValueError('no one is asked to act')
+        if command == 'raise' and (not self.can_raise(self.waiting) or amount % 5 != 0):
+            raise ValueError(f'cannot raise ¥{amount} now')
+        if command not in ('fold', 'call', 'raise'):
+            raise ValueError(f'unknown action {command!r}')
+        self.advance((command, amount))
+        return
 
-    slow_print(f"尊敬 的 {player.name} 您好！  欢迎 莅临 第八届 世界 德扑 大赛 总决赛 !!!")
-    slow_print("Designed - and - Coded - by - FelixZhang - from - Shanghai - China - Oct/2024.")
-    print(indenture * ' ', end='', flush=True)
-    time.sleep(2)
-    print('')
-    slow_print("今天 我们 很荣幸 地 邀请 到了 本届 比赛 的 全球 6 强 选手，他们 是:")
-    print('')
-    print(indenture * ' ', end='', flush=True)
-    for i in range(6):
-        time.sleep(1)
-        print(f"{players[i].name}  ", end='', flush=True)
-    print("""
-          """)
-    go_on()
-    print('')
-    slow_print("以下 是 本次 比赛 的 简要 规则:")
-    print('')
-    slow_print(f"每位 选手 开局 均 持有 ¥ {chipset} 的 筹码。")
-    slow_print(f"小 盲注 为 ¥ {small_blind}，大 盲注 为 ¥ {2*small_blind}。")
-    print('')
-    slow_print("上述 名单 顺序 即 为 比赛 时 各位 选手 的 下注 顺序， 每局 比赛 结束 后 将 往下 顺移 一位。")
-    print('')
-    slow_print("比 赛 开 始 后:")
-    print(indenture * ' ' + "输入 '弃' - 弃牌离场。")
-    print(indenture * ' ' + "输入 '跟' - 跟牌继续。")
-    print(indenture * ' ' + "输入 '加' - 加注，并注明您想额外加注的¥数量。")
-    print(
-        indenture * ' ' + "输入 '信息' - 显示相关信息，如您的底牌、在场玩家数量、场内筹码规模、追平所需筹码、您所剩筹码等。")
-    go_on()
-    print("""
-          """)
-    print(indenture * ' ' + '<(￣︶￣)↗[GO!])> 比赛开始!')
+    def advance(self, action):
+        try:
+            self.waiting = self.flow.send(action)
+        except StopIteration:
+            self.waiting = None
+            if self.speculation is not None:
+                self.speculation.stop()
+            self.emit('end')
+        return
 
+    def play_hand(self):
+        self.players = self.players[1:] + [self.players[0]]  # move order clockwise
+
+        for i in self.players:  # initialize the game
+            if i.money < 10:
+                i.playing = False  # to see if a player is dead
+            else:
+                i.playing = True
+            i.ready = False
+            i.is_allin = False
+            i.stake = 0
+            i.down = []
+            i.tracker = EquityTracker()
+            i.bluff_chance = i.style()['bluff_chance']
+        self.table.reset(self.players)
+
+        self.cards_on_table = []  # clear the cards on table
+        self.is_someone_allin = False  # clear all_in
+        self.raises = {}
+        self.batch = None
+        self.batch_players = []
+        self.batch_street = None
+        if self.pack_cards is None:
+            self.pack = Pack()  # get a new pack of cards
+            self.pack.wash()  # then wash it
+        else:
+            self.pack = RecordedPack(self.pack_cards)
+
+        for i in self.players:
+            if i.playing:
+                i.down.extend(self.pack.draw(1))  # get the first down-card for all active players
+
+        for i in self.players:
+            if i.playing:
+                i.down.extend(self.pack.draw(1))  # get the second down-card
+        if self.speculation is not None:
+            self.speculation.start(self)  # think ahead while the human looks at the down-cards
+        self.emit('deal')
+
+        for street, n in (('blind', 0), ('flop', 3), ('turn', 1), ('river', 1)):
+            if n > 0 and self.is_someone_allin:  # no more betting, the cards just come
+                self.emit('runout', street=street, last_players=[i for i in self.players if i.playing])
+            self.cards_on_table.extend(self.pack.rd_draw(n))
+            if self.speculation is not None and n > 0:
+                self.speculation.start(self)  # think ahead while the street is shown and the human decides
+            self.emit('street', street=street)
+            started = time.perf_counter()
+            over = yield from self.betting()
+            if metrics is not None:  # the whole betting of the street, the human's thinking included
+                metrics.record('street', time.perf_counter() - started, street=street, bet_rounds=self.n_bet_round,
+                               players=len([i for i in self.players if i.playing]))
+            if over:
+                return  # to end this round
+            if len([i for i in self.players if i.playing]) == 0:
+                return
+
+        self.showdown()
+        return  # End this round of game
+
+    def betting(self):  # the betting of one street, True if it leaves a single player who takes the pot
+        bet0 = self.stake_ready()
+        bet = 0
+        self.n_bet_round = 0
+        while self.still_betting(self.n_bet_round):
+            self.n_bet_round += 1
+            for i in self.players:
+                if not i.playing:
+                    continue
+                elif self.active_player_number() == 1:
+                    i.win()
+                    return True
+                elif i.is_allin:
+                    continue
+                else:
+                    if self.sum_player_stakes() == 0:
+                        self.table.put(i, small_blind)
+                        i.ready = True
+                        self.emit('blind', player=i, amount=small_blind)
+                    elif self.sum_player_stakes() == small_blind:
+                        self.table.put(i, 2 * small_blind)
+                        i.ready = True
+                        self.emit('blind', player=i, amount=2 * small_blind)
+                    elif i is self.human:
+                        if self.stake_ready() == i.stake and bet > 0:
+                            continue
+                        else:
+                            if self.speculation is not None:
+                                self.speculation.start(self)  # the opponents of the computer players may have changed
+                            command, amount = yield i
+                            if command == 'fold':
+                                i.fold()
+                            elif command == 'call':
+                                i.call()
+                            else:
+                                i.rise(amount)
+                    else:
+                        if self.stake_ready() > i.stake or (self.stake_ready() == i.stake and bet == 0):
+                            i.decide()  ###the computer uses Monte-Carlo simulation to make an ultra-rational decision!
+                        elif self.stake_ready() == i.stake and bet > 0:
+                            continue
+
+                bet = self.stake_ready() - bet0
+        return False
+
+    def showdown(self):
+        last_players = [i for i in self.players if i.playing]
+        self.emit('showdown', last_players=last_players)
+
+        # Find the winner of every pot! The chips no one could call go back first
+        values = {i: evaluate_7([c.id for c in i.down + self.cards_on_table]) for i in last_players}
+        person, uncalled = self.table.uncalled(self.players)
+        if uncalled > 0:
+            self.table.put(person, -uncalled)
+        pots = self.table.pots(self.players)
+        for k, (amount, eligible) in enumerate(pots):
+            max_value = max(values[i] for i in eligible)
+            winners = [i for i in eligible if values[i] == max_value]
+
+            if len(winners) == 0:
+                self.emit('bug')
+            elif len(winners) == 1:
+                winners[0].win(amount, k, len(pots))
+            else:
+                divided_pot = amount // len(winners) // 5 * 5
+                for i in winners:
+                    i.money += divided_pot
+                winners[0].money += amount - divided_pot * len(winners)  # the odd chips
+                self.emit('split', winners=winners, amount=amount, pot=k, pots=len(pots))
+        return
+
+
+######################################## Metrics ########################################
+# Opt-in instrumentation (--metrics FILE), to see why a computer player stalls: every winning rate, decision and
+# street is written to FILE as one JSON line with how long it took, and when the session ends the latencies of each
+# kind are summed up as a histogram. Only the process that started it records, not the pool's or the
+# tournament's workers.
+metrics = None  # the Metrics of the session, None when nothing is recorded
+metrics_buckets_ms = (0.1, 1, 10, 100, 1000, 10000)  # the edges of the histogram
+street_names = {0: 'blind', 3: 'flop', 4: 'turn', 5: 'river'}
+
+
+class Metrics:
+    def __init__(self, path):
+        self.file = open(path, 'a', encoding='utf-8')
+        self.pid = os.getpid()
+        self.latencies = collections.defaultdict(list)  # kind -> seconds of every record
+        self.lock = threading.Lock()
+
+    def record(self, kind, seconds, **fields):
+        if os.getpid() != self.pid:
+            return
+        line = json.dumps(dict(kind=kind, time=time.time(), seconds=seconds, **fields), ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + '\n')
+            self.latencies[kind].append(seconds)
+        return
+
+    def summary(self):
+        lines = []
+        for kind, seconds in sorted(self.latencies.items()):
+            seconds = sorted(seconds)
+            n = len(seconds)
+            lines.append(f"{kind}: {n} records, p50 {seconds[n // 2] * 1000:.2f} ms, "
+                         f"p99 {seconds[min(n - 1, math.ceil(n * 0.99) - 1)] * 1000:.2f} ms, max {seconds[-1] * 1000:.2f} ms")
+            edges = [0] + [edge / 1000 for edge in metrics_buckets_ms] + [math.inf]
+            for low, high in zip(edges, edges[1:]):
+                count = sum(1 for x in seconds if low <= x < high)
+                label = f"< {high * 1000:g} ms" if high != math.inf else f">= {low * 1000:g} ms"
+                lines.append(f"  {label:>12} {count:8} {'#' * round(40 * count / n)}")
+        return '\n'.join(lines)
+
+    def close(self):
+        if os.getpid() != self.pid:
+            return
+        self.file.close()
+        if self.latencies:
+            renderer.report('\n' + self.summary())
+        return
+
+
+def start_metrics(path):
+    global metrics
+    metrics = Metrics(path)
+    atexit.register(metrics.close)
     return
 
 
-# how many inter-rounds have occurred for a certain street
-n_bet_round = 0
-# the public cards drawn and shown on the table
-cards_on_table = []
-# is someone all_in ?
-is_someone_allin = False
+def write_profile(profiler, path):  # the hot path of the session, by cumulative time
+    profiler.disable()
+    with open(path, 'w', encoding='utf-8') as f:
+        pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(60)
+    renderer.report(f"profile written to {path}")
+    return
 
 
-def stake_ready():
-    return max(p.stake for p in players)
+######################################## Speculation ########################################
+# The game spends most of its time waiting for the human (and pausing between cards), while the CPU sits idle.
+# So as soon as a street is dealt, a background thread simulates the full winning rate of every computer player
+# still betting, into the equity cache, and on the turn it also ranks every river table that may come.
+# A computer player whose turn comes takes its finished result; if the thread hasn't got that far, it decides the
+# usual way, since a full run costs more than a decision that may stop early. The thread is told to stop when the
+# street is over, and does so after the situation it is working on. A fold or a raise changes the opponents of the
+# others, so the thread starts over whenever the human is to act and the situations have changed.
+# Nobody waits for a stopped run: the next one is queued at once, and what the old one still finishes only goes to
+# the cache under its own situation, or to the results of its own run, which no one reads any more. The runs go to
+# one thread that lives as long as the game, as starting a thread waits for the busy one to let it run.
+class Speculation:
+    def __init__(self):
+        self.thread = None  # started on first use
+        self.runs = queue.SimpleQueue()  # what the thread is to work out next, every run but the last one cancelled
+        self.cancelled = threading.Event()
+        self.cancelled.set()  # nothing is being worked out
+        self.table_ids = None
+        self.keys = {}  # player -> (situation, ranges) the thread works out for it
+        self.finished = {}  # player -> set once the thread is done with it
+        self.results = {}  # player -> its Estimate, when it is up against ranges (the cache has the others)
+        self.rng = random.Random()  # its own seeds, so the game's random stream doesn't depend on the thread
+
+    def start(self, game):
+        table_ids = [c.id for c in game.cards_on_table]
+        keys = {}
+        for i in game.players:
+            if i.playing and not i.is_allin and i is not game.human:
+                num_opponents, ranges = game.opponents(i)
+                if table_ids or ranges is not None or preflop_equity(i.down, num_opponents) is None:
+                    keys[i] = (canonical_situation([c.id for c in i.down], table_ids, num_opponents), ranges)
+        if not self.cancelled.is_set() and table_ids == self.table_ids and keys == self.keys:
+            return  # already on it
+        self.stop()
+        self.table_ids = table_ids
+        self.cancelled = threading.Event()
+        self.keys = keys
+        self.finished = {i: threading.Event() for i in keys}
+        self.results = {}
+        jobs = [(i, [c.id for c in i.down], self.rng.getrandbits(64)) for i in keys]
+        self.runs.put((jobs, table_ids, keys, self.cancelled, self.finished, self.results))
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.work, daemon=True)
+            self.thread.start()
+        return
 
+    def work(self):
+        while True:
+            self.run(*self.runs.get())
 
-def sum_player_stakes():
-    return sum(p.stake for p in players)
+    def run(self, jobs, table_ids, keys, cancelled, finished, results):
+        for person, down_ids, seed in jobs:
+            key, ranges = keys[person]
+            if cancelled.is_set():
+                pass
+            elif ranges is not None:
+                results[person] = estimate_equity(down_ids, table_ids, key[-1], seed=seed, ranges=ranges)
+            elif equity_cache.get(key) is None:  # a full run, exact if it can
+                equity_cache.put(key, estimate_equity(down_ids, table_ids, key[-1], seed=seed))
+            finished[person].set()
+        if len(table_ids) == 4:  # the river is the next street, whichever card it brings
+            for river in unknown_ids(ids_mask(table_ids)):
+                if cancelled.is_set():
+                    break
+                river_ranking(table_ids + [river])
+        return
 
+    def result(self, person, opponents):  # the speculated winning rate of person against these opponents, if ready
+        key = self.keys.get(person)
+        if key is None or (key[0][-1], key[1]) != opponents or not self.finished[person].is_set():
+            return None
+        if key[1] is not None:
+            return self.results.get(person)
+        return equity_cache.get(key[0])
+
+    def stop(self):  # tell the thread to stop, without waiting for it
+        self.cancelled.set()
+        for finished in self.finished.values():
+            finished.set()
+        self.keys = {}
+        return
 
-def active_player_number():
-    return sum(1 for p in players if p.playing)
 
+######################################## Hand History ########################################
+# Every hand played, appended to a file (--history FILE) so it can be looked at or played again later. After a short
+# header, each hand is one record prefixed by its length in 2 bytes:
+#   the players in the order of betting, each as 1 byte of name length, the name in UTF-8 and 4 bytes of money
+#   1 byte for how many cards came out of the pack, then one byte per card id, in the order they were drawn
+#   2 bytes for how many actions were taken, then 1 byte per action (seat * 4 + kind), a raise followed by 4 bytes
+#   the money of every player after the hand, 4 bytes each
+# A hand of six players takes about 90 bytes, so millions of self-play hands fit in a few hundred MB. A hand is
+# written with a single append, which also keeps the hands of tournament processes sharing one file apart.
+history_header = struct.Struct('<4sH')
+history_magic = b'HAND'
+history_version = 1
+history_kinds = {'fold': 0, 'check': 1, 'call': 1, 'raise': 2, 'allin': 3}  # event -> kind of action
+history_commands = ('fold', 'call', 'raise', 'allin')  # kind -> what the replayed player does
+hand_history = None  # the HandHistory the games are written to, None when nothing is kept
+
+
+class HandHistory:
+    def __init__(self, path):
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if os.fstat(self.fd).st_size == 0:
+            os.write(self.fd, history_header.pack(history_magic, history_version))
+        self.hands = {}  # game -> (players, actions, how many) of the hand it is playing
+
+    def listen(self, game, event, data):  # a listener of every game to be kept
+        if event == 'deal':
+            players = bytearray(struct.pack('<B', len(game.players)))
+            for i in game.players:
+                name = i.name.encode('utf-8')[:255]
+                players += struct.pack(f'<B{len(name)}sI', len(name), name, i.money)
+            self.hands[game] = [players, bytearray(), 0]
+        elif event in history_kinds and game in self.hands:
+            hand = self.hands[game]
+            hand[1].append((game.seat(data['player']) - 1) * 4 + history_kinds[event])
+            if event == 'raise':
+                hand[1] += struct.pack('<I', data['amount'])
+            hand[2] += 1
+        elif event == 'end' and game in self.hands:
+            players, actions, count = self.hands.pop(game)
+            live = [i for i in game.players if i.down]
+            cards = [i.down[0].id for i in live] + [i.down[1].id for i in live] + [c.id for c in game.cards_on_table]
+            record = players + struct.pack(f'<B{len(cards)}BH', len(cards), *cards, count) + actions + \
+                struct.pack(f'<{len(game.players)}I', *(i.money for i in game.players))
+            os.write(self.fd, struct.pack('<H', len(record)) + record)
+        return
 
-def info():
-    temp_info = f"""
-  您的底牌 :{player.down[0].show()} {player.down[1].show()}
-在场玩家数量: {active_player_number()}
-场内所有筹码: ¥{sum_player_stakes()}
-您的在场筹码: ¥{player.stake}
-追平所需筹码: ¥{stake_ready() - player.stake}
-您的所剩筹码: ¥{player.money}"""
-    return temp_info
+    def forget(self, game):  # the game was left in the middle of a hand
+        self.hands.pop(game, None)
+        return
 
+    def close(self):
+        os.close(self.fd)
+        return
+
+
+class HandRecord:  # a hand read back from the history
+    def __init__(self, names, money, cards, actions, result):
+        self.names = names  # the players in the order of betting
+        self.money = money  # what each of them had before the hand
+        self.cards = cards  # the ids of the cards, in the order they were drawn
+        self.actions = actions  # (seat, command, amount) of every action taken
+        self.result = result  # what each of them had after the hand
+
+
+def parse_hand(payload):
+    n = payload[0]
+    at = 1
+    names, money = [], []
+    for _ in range(n):
+        length = payload[at]
+        names.append(payload[at + 1:at + 1 + length].decode('utf-8'))
+        money.append(struct.unpack_from('<I', payload, at + 1 + length)[0])
+        at += 5 + length
+    n_cards = payload[at]
+    cards = list(payload[at + 1:at + 1 + n_cards])
+    at += 1 + n_cards
+    (n_actions,) = struct.unpack_from('<H', payload, at)
+    at += 2
+    actions = []
+    for _ in range(n_actions):
+        seat, kind = divmod(payload[at], 4)
+        at += 1
+        amount = 0
+        if history_commands[kind] == 'raise':
+            (amount,) = struct.unpack_from('<I', payload, at)
+            at += 4
+        actions.append((seat, history_commands[kind], amount))
+    result = list(struct.unpack_from(f'<{n}I', payload, at))
+    return HandRecord(names, money, cards, actions, result)
+
+
+def read_history(path):  # every HandRecord of the file, read as it goes instead of all at once
+    with open(path, 'rb') as f:
+        magic, version = history_header.unpack(f.read(history_header.size))
+        if (magic, version) != (history_magic, history_version):
+            raise ValueError(f'{path} is not a hand history this game can read')
+        while True:
+            prefix = f.read(2)
+            if len(prefix) < 2:
+                return
+            (length,) = struct.unpack('<H', prefix)
+            payload = f.read(length)
+            if len(payload) < length:  # the last hand was cut short
+                return
+            yield parse_hand(payload)
 
-############################## the program jumps here when someone has won and goes to the next round ############################
-def new_round():
-    global players
-    global player
-    global cards_on_table
-    global n_bet_round
-    global is_someone_allin
 
-    players = players[1:] + [players[0]]  # move order clockwise
-    player_order = players.index(player)  # find YOUR order
+class RecordedPack(Pack):  # the cards of a recorded hand, coming out in the order they did then
+    def __init__(self, card_ids):
+        self.cards = [all_cards[c] for c in reversed(card_ids)]
 
-    for i in players:  # initialize the game
-        if i.money < 10:
-            i.playing = False  # to see if a player is dead
+    def rd_draw(self, n):
+        return self.draw(n)
+
+
+class ReplayPerson(Person):  # a player of a recorded hand, who acts as the history says instead of deciding
+    def __init__(self, name, money):
+        super().__init__(name)
+        self.money = money
+        self.actions = collections.deque()  # (command, amount) still to be taken
+
+    def decide(self):
+        command, amount = self.actions.popleft()
+        if command == 'fold':
+            self.fold()
+        elif command == 'call':
+            self.call()
+        elif command == 'raise':
+            self.rise(amount)
         else:
-            i.playing = True
-        i.ready = False
-        i.is_allin = False
-        i.stake = 0
-        i.down = []
-        i.hand = []
-        i.bluff_chance = bluff_chance
-
-    cards_on_table = []  # clear the cards on table
-    is_someone_allin = False  # clear all_in
-    pack = Pack()  # get a new pack of cards
-    pack.wash()  # then wash it
-
-    for i in players:
-        if i.playing:
-            i.down.extend(pack.draw(1))  # get the first down-card for all active players
-
-    for i in players:
-        if i.playing:
-            i.down.extend(pack.draw(1))  # get the second down-card
+            self.rise(self.money)  # all of it, whatever is left to call
+        return
+
+
+def replay_hand(record):  # play a recorded hand through the engine again, True if it ends as it did
+    seats = [ReplayPerson(name, money) for name, money in zip(record.names, record.money)]
+    for seat, command, amount in record.actions:
+        seats[seat].actions.append((command, amount))
+    game = Game(seats[-1:] + seats[:-1])  # play_hand moves everyone one seat on before dealing
+    game.pack_cards = record.cards
+    try:
+        game.start_hand()
+    except IndexError:  # someone was asked to act more often than they did
+        return False
+    return [i.money for i in seats] == record.result and not any(i.actions for i in seats)
+
+
+def replay_history(path):
+    start = time.perf_counter()
+    hands = 0
+    differ = 0
+    for record in read_history(path):
+        hands += 1
+        if not replay_hand(record):
+            differ += 1
+            print(f"hand {hands} ends differently when replayed")
+    seconds = time.perf_counter() - start
+    print(f"{hands} hands replayed in {seconds:.1f}s ({hands / max(seconds, 1e-9):.0f} hands/s), "
+          f"{os.path.getsize(path) / max(hands, 1):.0f} bytes a hand, {differ} differ")
+    return differ == 0
+
+
+######################################## Tournament ########################################
+# Computer players against each other, on many tables at once, to see how strong decide() is over many hands.
+# Every table has its own seed, so a tournament is repeatable whatever the number of processes it runs on.
+# a table still undecided after this many hands is stopped and scored as it stands
+tournament_max_hands = 5000
+# the module's settings a table is played with; the command line and strategy.json only set them in the process that
+# starts the tables, and a worker started by spawn or forkserver imports the module afresh with the defaults
+table_setting_names = strategy_names + ('simulation_engine', 'sampling', 'decision_time_budget', 'adaptive_stopping',
+                                        'shared_equity', 'live_opponents', 'opponent_ranges')
+
+
+def table_settings():
+    return {name: globals()[name] for name in table_setting_names}
+
+
+def play_table(seed, table, num_players=6, strategies=None, max_hands=None, history=None, settings=None):
+    # play a table until one player holds every chip; strategies gives the style of each seat, None for the module's
+    # history: the file every hand is appended to, if any
+    # settings: the table_settings() of the process that started the tables, applied here before anything is dealt
+    global num_workers
+    num_workers = 1  # the tables are what runs in parallel, each decision stays in its own process
+    if settings is not None:
+        globals().update(settings)
+    random.seed(f"{seed}-{table}")
+    equity_cache.clear()  # an answer remembered from another table would make the result depend on the order
+    seats = [Person(f"{k + 1}") for k in range(num_players)]
+    if strategies is not None:
+        for p, strategy in zip(seats, strategies):
+            p.strategy = strategy
+    if max_hands is None:
+        max_hands = tournament_max_hands
+    game = Game(seats.copy())
+    if history is not None:
+        writer = HandHistory(history)
+        game.listeners.append(writer.listen)
+    hands = 0
+    start = time.perf_counter()
+    while hands < max_hands and sum(1 for p in seats if p.money >= 2 * small_blind) > 1:
+        game.start_hand()
+        hands += 1
+    chips = [p.money for p in seats]
+    if history is not None:
+        writer.close()
+    return table, hands, time.perf_counter() - start, chips
+
+
+def run_tournament(num_tables, seed=0, workers=1, num_players=6, history=None):
+    start = time.perf_counter()
+    if history is not None:
+        HandHistory(history).close()  # the header is written once, before the tables share the file
+    arguments = (itertools.repeat(seed), range(num_tables), itertools.repeat(num_players), itertools.repeat(None),
+                 itertools.repeat(None), itertools.repeat(history), itertools.repeat(table_settings()))
+    if workers > 1:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(play_table, *arguments)
+    else:
+        executor = None
+        results = map(play_table, *arguments)
+
+    total_hands = 0
+    wins = [0] * num_players
+    chip_sum = [0] * num_players
+    for table, hands, seconds, chips in results:  # in the order of the tables, as soon as each is finished
+        winner = chips.index(max(chips))
+        total_hands += hands
+        wins[winner] += 1
+        for k in range(num_players):
+            chip_sum[k] += chips[k]
+        print(f"table {table}: seat {winner + 1} wins after {hands} hands ({hands / seconds:.1f} hands/s), chips {chips}",
+              flush=True)
+    if executor is not None:
+        executor.shutdown()
+    seconds = time.perf_counter() - start
 
     print('')
-    slow_print("玩 家 所 剩 筹 码： ")
-    print((indenture - 30) * ' ', end='', flush=True)
-    for i in players:
-        print(f"{i.name} ¥{i.money}   ", end='', flush=True)  # inform of each player's remaining chip size
+    print(f"{num_tables} tables, {total_hands} hands in {seconds:.1f}s, {total_hands / seconds:.1f} hands/s")
+    print('seat   win rate   chip EV per table')
+    for k in range(num_players):
+        print(f"{k + 1:>4}   {wins[k] / num_tables:>8.1%}   {chip_sum[k] / num_tables - chipset:>+17.1f}")
+    return wins, chip_sum
+
+
+######################################## Strategy ########################################
+# The constants behind decide() are searched by self-play: every generation, each candidate style takes one seat
+# against the current style on the same tables (common random seeds, so luck of the deal cancels out between
+# candidates), the best quarter survive and the rest are replaced by their mutations.
+# The best candidate of all generations is played again on fresh tables, and only if it beats the current style there
+# is it written to strategy.json, which the game loads at startup.
+strategy_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'strategy.json')
+# how many candidate styles play in a generation, for how many generations
+tune_population = 8
+tune_generations = 5
+# how many tables each candidate plays per generation, of at most how many hands
+tune_tables = 12
+tune_hands = 100
+
+
+def current_strategy():
+    return {name: globals()[name] for name in strategy_names}
+
+
+def load_strategy(path=None):  # take the style constants from the file, if there is one
+    global raise_bands
+    if path is None:
+        path = strategy_path
+    if not os.path.exists(path):
+        return False
+    with open(path, encoding='utf-8') as f:
+        values = json.load(f)
+    for name in strategy_names:
+        if name in values:
+            globals()[name] = values[name]
+    raise_bands = [tuple(band) for band in raise_bands]
+    return True
+
+
+def save_strategy(strategy, path=None):
+    if path is None:
+        path = strategy_path
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(strategy, f, indent=2)
+    os.replace(path + '.tmp', path)
+    return
 
-    print("""
 
-          """)
-    slow_print("您 抽 到 的 底 牌 是: ")
-    print(indenture * " ", end='', flush=True)
-    time.sleep(1.5)
-    print(f"{player.down[0].show()}  ", end='', flush=True)
-    time.sleep(1.5)
-    print(f"{player.down[1].show()}")
-    go_on()
-    print("""                                           
-          """)
-    print(indenture * ' ' + '盲注轮开始下注!')
+def mutate_strategy(strategy, rng):
+    s = dict(strategy)
+    for name in ('bluff_chance', 'bluff_chance_increase', 'bluff_chance_after', 'bluff_chance_whatsoever'):
+        s[name] = round(min(max(s[name] + rng.gauss(0, 0.05), 0.0), 1.0), 3)
+    s['bluff_chance_cap'] = round(min(max(s['bluff_chance_cap'] + rng.gauss(0, 0.05), s['bluff_chance']), 1.0), 3)
+    s['raise_threshold'] = round(min(max(s['raise_threshold'] + rng.gauss(0, 0.03), 0.3), 0.9), 3)
+    thresholds = sorted(min(max(threshold + rng.gauss(0, 0.02), s['raise_threshold']), 0.99)
+                        for threshold, most in s['raise_bands'])
+    mosts = [max(1, most + rng.choice((-1, 0, 1))) for threshold, most in s['raise_bands']]
+    s['raise_bands'] = [(round(threshold, 3), most) for threshold, most in zip(thresholds, mosts)]
+    s['raise_top'] = max(1, s['raise_top'] + rng.choice((-1, 0, 1)))
+    return s
+
+
+def score_strategies(candidates, tables_seed, executor, num_players=6):
+    # the chips per table each candidate wins against the current style, all on the same tables
+    # the current style is handed to every other seat, as the workers may not have loaded strategy.json themselves
+    baseline = current_strategy()
+    settings = table_settings()
+    jobs = []
+    for candidate in candidates:
+        for table in range(tune_tables):
+            strategies = [baseline] * num_players
+            strategies[table % num_players] = candidate  # the candidate takes every seat in turn
+            job = (tables_seed, table, num_players, strategies, tune_hands, None, settings)  # same tables for all
+            jobs.append(executor.submit(play_table, *job) if executor is not None else play_table(*job))
+    results = [job.result() for job in jobs] if executor is not None else jobs
+    scores = []
+    for k in range(len(candidates)):
+        chips = [results[k * tune_tables + table][3][table % num_players] for table in range(tune_tables)]
+        scores.append(sum(chips) / tune_tables - chipset)
+    return scores
+
+
+def tune_strategy(seed=0, workers=1, num_players=6):
+    rng = random.Random(f"{seed}-tune")
+    baseline = current_strategy()
+    candidates = [baseline] + [mutate_strategy(baseline, rng) for _ in range(tune_population - 1)]
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    best, best_score = baseline, None  # the best candidate of all generations
+    for generation in range(tune_generations):
+        scores = score_strategies(candidates, f"{seed}-{generation}", executor, num_players)
+        order = sorted(range(len(candidates)), key=lambda k: scores[k], reverse=True)
+        if best_score is None or scores[order[0]] > best_score:
+            best, best_score = candidates[order[0]], scores[order[0]]
+        print(f"generation {generation + 1}: best {scores[order[0]]:+.1f}, worst {scores[order[-1]]:+.1f} "
+              f"chips per table against the current style", flush=True)
+        parents = [candidates[k] for k in order[:max(1, len(candidates) // 4)]]
+        candidates = parents + [mutate_strategy(rng.choice(parents), rng)
+                                for _ in range(tune_population - len(parents))]
+    # a score picked as the best of many is lucky, so the winner plays the current style again on tables it hasn't seen
+    if best is not baseline:
+        best_score, baseline_score = score_strategies([best, baseline], f"{seed}-check", executor, num_players)
+    if executor is not None:
+        executor.shutdown()
+    if best is baseline or best_score <= baseline_score:
+        print("no improvement on the current style, nothing saved")
+        return baseline
+    print(f"{best_score:+.1f} chips per table against the current style on fresh tables, "
+          f"where it makes {baseline_score:+.1f} itself")
+    save_strategy(best)
+    print(f"saved to {strategy_path}:")
+    print(json.dumps(best))
+    return best
 
-    print(indenture * ' ', end='', flush=True)  # set the cursor to the table center
 
-    ################################################### Blind-Round ######################################################################
-    bet0 = stake_ready()
-    bet = 0
-    n_bet_round = 0
-    while still_betting(n_bet_round):
-        n_bet_round += 1
-        for i in players:
-            if not i.playing:
-                continue
-            elif active_player_number() == 1:
-                i.win()
-                return
-            elif i.is_allin:
-                continue
-            else:
-                if sum_player_stakes() == 0:
-                    i.stake = 5
-                    i.money -= 5
-                    i.ready = True
-                    print(f"{players.index(i) + 1}", end='', flush=True)
-                    print(f"""{i.name} 下小盲注¥{small_blind}...""")
-                    print(indenture * ' ', end='', flush=True)
-                elif sum_player_stakes() == 5:
-                    i.stake = 10
-                    i.money -= 10
-                    i.ready = True
-                    print(f"{players.index(i) + 1}", end='', flush=True)
-                    print(f"""{i.name} 下大盲注¥{small_blind * 2}...""")
-                    print(indenture * ' ', end='', flush=True)
-                elif players.index(i) == player_order:
-                    if stake_ready() == i.stake and bet > 0:
-                        continue
-                    else:
-                        player_choose(i)
-                else:
-                    if stake_ready() > i.stake or (stake_ready() == i.stake and bet == 0):
-                        i.decide()  ###the computer uses Monte-Carlo simulation to make an ultra-rational decision!
-                    elif stake_ready() == i.stake and bet > 0:
-                        continue
+######################################## Benchmark ########################################
+# How fast the parts of the game are, measured instead of guessed: every case is run over and over on situations
+# dealt by its own random stream (set up outside the timing), and reported as operations per second with the median
+# and 99th percentile latency. The results are saved to benchmark.json and compared with a baseline saved earlier
+# on the same machine, and any case that lost more than benchmark_tolerance of its throughput fails the run.
+# Against a baseline every case is run as many times as it was then, so both went through the same situations.
+# Every case goes through its situations benchmark_repeats times, each time with cold caches, and reports the median
+# repeat. A busy machine only ever makes a repeat slower, so runs are compared by their fastest repeat, and a case
+# counts as slower when that lost more than benchmark_tolerance. How far apart the repeats were is kept as its noise:
+# a case too noisy in either run to tell is reported as inconclusive, and fails the run as a regression does.
+benchmark_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark.json')
+benchmark_baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+# how long every case is repeated for, at least benchmark_min_runs times
+benchmark_seconds = 0.3
+benchmark_min_runs = 5
+benchmark_repeats = 5
+benchmark_tolerance = 0.35  # identical code drifted up to 29% between runs on a busy single core
+benchmark_max_noise = 0.5  # repeats further apart than this, as a share of the median, can't tell a regression
+benchmark_streets = (('preflop', 0), ('flop', 3), ('turn', 4), ('river', 5))
+
+
+def benchmark_cases():  # (name, setup(rng) -> the arguments of one run, run(arguments)) of every case
+    cases = [('hand_value', lambda rng: rng.sample(all_cards, 5), hand_value),
+             ('evaluate_7', lambda rng: [c.id for c in rng.sample(all_cards, 7)], evaluate_7)]
+    for street, n_table in benchmark_streets:
+        for n in range(1, 6):
+            cases.append((f"winning_rate/{street}/{n}opp",
+                          lambda rng, n_table=n_table: (rng.sample(all_cards, 2 + n_table), rng.getrandbits(64)),
+                          lambda args, n=n: winning_rate(args[0][:2], args[0][2:], benchmark_simulations(), args[1],
+                                                         num_opponents=n)))
+    for street, n_table in benchmark_streets:
+        for n in range(1, 6):
+            cases.append((f"decide/{street}/{n}opp",
+                          lambda rng, n_table=n_table, n=n: benchmark_decision(rng, n_table, n),
+                          lambda person: person.decide()))
+    for n in range(2, 7):
+        cases.append((f"hand/{n}players", lambda rng, n=n: benchmark_table(n), lambda game: game.start_hand()))
+    return cases
+
+
+def benchmark_simulations():  # what a winning rate simulates by default, asked for explicitly to skip the tables
+    return num_simulation_numpy if simulation_engine == 'numpy' and np is not None else num_simulation_python
+
+
+def benchmark_table(num_players):
+    equity_cache.clear()
+    return Game([Person(f"{k + 1}") for k in range(num_players)])
+
+
+def benchmark_decision(rng, n_table, num_opponents):  # a computer player facing a bet in the middle of a hand
+    game = benchmark_table(num_opponents + 1)
+    cards = rng.sample(all_cards, 2 * len(game.players) + n_table)
+    for k, p in enumerate(game.players):
+        p.down = cards[2 * k:2 * k + 2]
+        p.tracker = EquityTracker()
+        p.stake = 20 * small_blind
+    game.cards_on_table = cards[2 * len(game.players):]
+    game.players[0].stake = 10 * small_blind
+    game.table.reset(game.players)
+    return game.players[0]
+
+
+def run_benchmark(pattern='', runs=None):  # the results of the cases whose name holds pattern
+    # runs: how many times to run each case by name, otherwise for benchmark_seconds
+    results = {}
+    print(f"{'case':28} {'ops/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'noise':>9}")
+    for name, setup, run in benchmark_cases():
+        if pattern not in name:
+            continue
+        repeats = []
+        for _ in range(benchmark_repeats):
+            equity_cache.clear()  # every repeat starts cold, or the later ones would only time the caches
+            river_rankings.clear()
+            rng = random.Random(name)
+            random.seed(name)  # the decisions draw from the game's random module too
+            latencies = []
+            start = time.perf_counter()
+            while (len(latencies) < runs[name] if runs and name in runs else
+                   len(latencies) < benchmark_min_runs or time.perf_counter() - start < benchmark_seconds):
+                args = setup(rng)
+                begin = time.perf_counter()
+                run(args)
+                latencies.append(time.perf_counter() - begin)
+            runs = dict(runs or {}, **{name: len(latencies)})  # the same situations in every repeat
+            repeats.append(latencies)
+        repeats.sort(key=sum)
+        ops = [len(latencies) / sum(latencies) for latencies in repeats]
+        latencies = sorted(repeats[len(repeats) // 2])  # the median repeat
+        results[name] = {'ops': len(latencies) / sum(latencies), 'best': max(ops), 'runs': len(latencies),
+                         'noise': (max(ops) - min(ops)) / (len(latencies) / sum(latencies)),
+                         'p50_ms': latencies[len(latencies) // 2] * 1000,
+                         'p99_ms': latencies[min(len(latencies) - 1, math.ceil(len(latencies) * 0.99) - 1)] * 1000}
+        r = results[name]
+        print(f"{name:28} {r['ops']:10.1f} {r['p50_ms']:10.3f} {r['p99_ms']:10.3f} {r['noise']:9.1%}", flush=True)
+    return {'engine': 'numpy' if simulation_engine == 'numpy' and np is not None else 'python',
+            'sampling': sampling, 'workers': num_workers, 'python': sys.version.split()[0],
+            'numpy': np.__version__ if np is not None else None, 'results': results}
+
+
+def compare_benchmark(report, baseline):
+    # (the names of the cases whose fastest repeat lost more than benchmark_tolerance, those too noisy to tell)
+    if any(report[k] != baseline.get(k) for k in ('engine', 'sampling', 'workers')):
+        print('the baseline was measured with another engine, sampling or number of workers')
+    regressed, inconclusive = [], []
+    for name, result in report['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        change = result['best'] / old.get('best', old['ops']) - 1
+        verdict = ''
+        if change < -benchmark_tolerance:
+            regressed.append(name)
+            verdict = '   REGRESSED'
+        elif max(result['noise'], old.get('noise', 0)) > benchmark_max_noise:
+            inconclusive.append(name)
+            verdict = '   INCONCLUSIVE'
+        print(f"{name:28} {old.get('best', old['ops']):10.1f} -> {result['best']:10.1f} ops/s {change:+8.1%}{verdict}")
+    return regressed, inconclusive
+
+
+def benchmark(pattern='', save_baseline=False):  # run, save and compare, True if nothing regressed or was too noisy
+    baseline = None
+    if os.path.exists(benchmark_baseline_path):
+        with open(benchmark_baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+    report = run_benchmark(pattern, {name: r['runs'] for name, r in baseline['results'].items()} if baseline else None)
+    with open(benchmark_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    regressed, inconclusive = [], []
+    if baseline is not None:
+        print('')
+        regressed, inconclusive = compare_benchmark(report, baseline)
+        print(f"{len(regressed)} of {len(report['results'])} cases regressed by more than {benchmark_tolerance:.0%}")
+        if inconclusive:
+            print(f"{len(inconclusive)} were too noisy to tell, run them again on a quieter machine")
+    if save_baseline:
+        if baseline is not None:  # keep the cases that were not run this time
+            report['results'] = dict(baseline['results'], **report['results'])
+        with open(benchmark_baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return not regressed and not inconclusive
+
+
+######################################## Game Server ########################################
+# Many tables at once (--server), each one a human connected over a local TCP socket against five computer players.
+# The protocol is lines of UTF-8 text: the server tells what happens at the table and, when it wants an answer, sends
+# a line starting with '>>'. The human answers 'fold', 'call', 'raise AMOUNT' or 'info' (or 弃/跟/加/信息), and after
+# a hand an empty line to go on or 'quit'. The tables are played on a pool of threads, so while a computer player
+# simulates at one table the event loop keeps talking to all the others; with --workers the simulations themselves
+# go to the processes. Every server_report_seconds the server prints how many tables are open and how many decisions
+# a second they make, to see how many tables a machine can take.
+server_host = '127.0.0.1'  # local connections only
+server_port = 7777
+server_threads = 8  # how many tables may be computing at the same time
+server_report_seconds = 10
+computer_names = ("赵金宝", "孙广智", "李延寿", "张国强", "吴家旺")
+server_commands = {'fold': 'fold', '弃': 'fold', 'call': 'call', '跟': 'call', 'raise': 'raise', '加': 'raise',
+                   'info': 'info', '信息': 'info'}
+
+
+class ServerStats:
+    def __init__(self):
+        self.tables = 0  # open right now
+        self.peak_tables = 0
+        self.hands = 0
+        self.decisions = 0
+        self.lock = threading.Lock()  # the decisions are counted on the tables' threads
+
+    def count(self, game, event, data):  # a listener of every table
+        if event == 'thought':
+            with self.lock:
+                self.decisions += 1
+        return
+
+    def open(self):
+        self.tables += 1
+        self.peak_tables = max(self.peak_tables, self.tables)
+        return
+
+    def close(self):
+        self.tables -= 1
+        return
 
-            bet = stake_ready() - bet0
 
-    if len([i for i in players if i.playing]) == 0:
+def event_lines(game, event, data):  # what a client is told of an event, as lines of text
+    player = game.human
+    i = data.get('player')
+    cards = '  '.join(c.show() for c in game.cards_on_table)
+    if event == 'deal':
+        return ['', '玩家所剩筹码: ' + '   '.join(f"{p.name} ¥{p.money}" for p in game.players),
+                f"您抽到的底牌是: {player.down[0].show()}  {player.down[1].show()}"]
+    elif event == 'street':
+        names = {'blind': '盲注轮', 'flop': '翻牌轮', 'turn': '转牌轮', 'river': '河牌轮'}
+        return [f"{names[data['street']]}开始下注!"] + ([f"公共牌: {cards}"] if cards else [])
+    elif event == 'blind':
+        return [f"{game.seat(i)} {i.name} 下{'小' if data['amount'] == small_blind else '大'}盲注¥{data['amount']}..."]
+    elif event == 'fold':
+        return [f"{game.seat(i)} {i.name} 弃牌..."]
+    elif event == 'check':
+        return [f"{game.seat(i)} {i.name} 过牌..."]
+    elif event == 'call':
+        return [f"{game.seat(i)} {i.name} 跟注至 ¥{data['stake']}..."]
+    elif event == 'raise':
+        return [f"{game.seat(i)} {i.name} 加注了 ¥{data['amount']}..."]
+    elif event == 'allin':
+        return [f"{game.seat(i)} {i.name} 把仅剩的 ¥{data['amount']}筹码 ALL-IN 了 !"]
+    elif event == 'runout':
+        last_players = data['last_players']
+        odds = runout_odds([[c.id for c in p.down] for p in last_players], [c.id for c in game.cards_on_table])
+        return ['ALL-IN! 摊开底牌看胜率:'] + [
+            f"{p.name} :  {p.down[0].show()}  {p.down[1].show()}    胜 {win:6.1%}   平 {tie:6.1%}"
+            for p, (win, tie) in zip(last_players, odds)]
+    elif event == 'showdown':
+        return [f"场上公共牌为: {cards}", '在场玩家的底牌为:'] + [
+            f"{p.name} :  {p.down[0].show()}  {p.down[1].show()}" for p in data['last_players']]
+    elif event == 'win':
+        where = '桌上所有' if data['pots'] == 1 else pot_name(data['pot'])
+        return [f"{i.name} 赢了! 拿走了{where}的¥{data['amount']}筹码!"]
+    elif event == 'split':
+        where = '桌上所有' if data['pots'] == 1 else pot_name(data['pot'])
+        return [f"{'  '.join(p.name for p in data['winners'])} 不相上下！平局！"
+                f"{len(data['winners'])}个人平分了{where}的¥{data['amount']}筹码!"]
+    elif event == 'bug':
+        return ['出BUG了！！！']
+    return []
+
+
+def server_action(line):  # (command, amount) of a line from the client, None if it isn't one
+    words = line.split()
+    if not words or words[0] not in server_commands:
+        return None
+    command = server_commands[words[0]]
+    if command != 'raise':
+        return (command, 0) if len(words) == 1 else None
+    if len(words) != 2 or not words[1].isdigit():
+        return None
+    return command, int(words[1])
+
+
+async def serve_table(reader, writer, executor, stats):  # one client, at its own table until it leaves or it's over
+    loop = asyncio.get_running_loop()
+
+    def send(*lines):
+        if not writer.is_closing():
+            writer.write(''.join(line + '\n' for line in lines).encode('utf-8'))
         return
 
-    ######################################################## Flop-Round ########################################################################
-    print("""
-          """)
-    slow_print('翻 牌 轮 开 始 下 注!')
-    print("")
-
-    cards_on_table.extend(pack.rd_draw(3))
-
-    slow_print("本 次 抽 到 的 翻 牌 是: ")
-    print(indenture * ' ', end='', flush=True)
-    time.sleep(2)
-    print(f"{cards_on_table[0].show()}  ", end='', flush=True)
-    time.sleep(2)
-    print(f"{cards_on_table[1].show()}  ", end='', flush=True)
-    time.sleep(2)
-    print(f"{cards_on_table[2].show()}")
-    print(indenture * ' ', end='', flush=True)
-    time.sleep(0.5)
-    print(f"(您的底牌是: {player.down[0].show()}  {player.down[1].show()})")
-    print(indenture * ' ', end='', flush=True)
-
-    bet1 = stake_ready()
-    bet = 0
-    n_bet_round = 0
-    while still_betting(n_bet_round):
-        n_bet_round += 1
-        for i in players:
-            if not i.playing:
-                continue
-            elif active_player_number() == 1:
-                i.win()
-                return  # to end this round
-            elif i.is_allin:
-                continue
-            else:
-                if players.index(i) == player_order:
-                    if stake_ready() == i.stake and bet > 0:
-                        continue
-                    else:
-                        player_choose(i)
+    def listener(game, event, data):  # called on the table's thread, so the writing is left to the event loop
+        lines = event_lines(game, event, data)
+        if lines:
+            loop.call_soon_threadsafe(send, *lines)
+        return
+
+    async def ask(prompt):  # the next line from the client, None once it has gone
+        send('>>' + prompt)
+        try:
+            await writer.drain()
+            line = await reader.readline()
+        except ConnectionError:
+            return None
+        if not line:
+            return None
+        return line.decode('utf-8', errors='replace').strip()
+
+    name = await ask('请输入您的大名')
+    if not name:
+        writer.close()
+        return
+    human = Person(name)
+    players = [Person(n) for n in computer_names] + [human]
+    random.shuffle(players)  # randomly determine the order of playing
+    game = Game(players, human=human)
+    game.listeners += [listener, stats.count]
+    if hand_history is not None:
+        game.listeners.append(hand_history.listen)
+    stats.open()
+    try:
+        while True:
+            await loop.run_in_executor(executor, game.start_hand)
+            while game.waiting is not None:
+                line = await ask("'fold'/'call'/'raise 金额'/'info'")
+                if line is None:
+                    return
+                action = server_action(line)
+                if action is None:
+                    send('输入有误!')
+                elif action[0] == 'info':
+                    send(*info(game, human).strip('\n').splitlines())
                 else:
-                    if stake_ready() > i.stake or (stake_ready() == i.stake and bet == 0):
-                        i.decide()  ###the computer uses Monte-Carlo simulation to make an ultra-rational decision!
-                    elif stake_ready() == i.stake and bet > 0:
-                        continue
+                    try:
+                        await loop.run_in_executor(executor, game.act, *action)
+                    except ValueError:
+                        send('输入有误!')
+            stats.hands += 1
+            others = len([p for p in players if p is not human and p.money > 2 * small_blind])
+            if human.money == 0:
+                send('你输光了！！！')
+                return
+            if others == 0:
+                send(f"恭喜{human.name} 获得了本届比赛的总冠军！")
+                return
+            if await ask("回车进入下一局, 'quit' 离开") in (None, 'quit'):
+                return
+    finally:
+        stats.close()
+        writer.close()
+        if hand_history is not None:
+            hand_history.forget(game)
+
 
-            bet = stake_ready() - bet1
+async def report_server(stats):
+    last = 0
+    while True:
+        await asyncio.sleep(server_report_seconds)
+        with stats.lock:
+            decisions = stats.decisions
+        print(f"{stats.tables} tables (peak {stats.peak_tables}), {stats.hands} hands, "
+              f"{(decisions - last) / server_report_seconds:.1f} decisions/s", flush=True)
+        last = decisions
+
+
+async def serve(port):
+    stats = ServerStats()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=server_threads)
+    server = await asyncio.start_server(lambda reader, writer: serve_table(reader, writer, executor, stats),
+                                        server_host, port)
+    print(f"serving tables on {server_host}:{port}", flush=True)
+    reporter = asyncio.create_task(report_server(stats))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        reporter.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+    return
 
-    if len([i for i in players if i.playing]) == 0:
+
+def run_server(port=None):
+    if num_workers > 1:
+        simulation_pool()  # start the simulation processes before the first table has to think
+    try:
+        asyncio.run(serve(port or server_port))
+    except KeyboardInterrupt:
+        pass
+    return
+
+
+######################################## Terminal ########################################
+# Everything the human sees and types: the events of the game are printed here, with the pauses that make it a game.
+# How they are shown is up to the renderer picked with --render: 'animated' is the game as it was written, word by
+# word and with pauses to read; 'instant' prints the same text without a single pause and skips the prompts that are
+# only there to wait for the reader; 'json' writes every event as a JSON line instead, for scripts and regression runs.
+class AnimatedRenderer:
+    def pause(self, seconds):
+        time.sleep(seconds)
         return
 
-    #############################################################Turn-Round###########################################################
-    print("""                                                   
-          """)
-    slow_print('转 牌 轮 开 始 下 注！')
-    print("")
-
-    cards_on_table.extend(pack.rd_draw(1))
-
-    slow_print("本 次 抽 到 的 转 牌 是:")
-    print(indenture * ' ', end='', flush=True)
-    print(f"{cards_on_table[0].show()}  {cards_on_table[1].show()}  {cards_on_table[2].show()}  ", end='', flush=True)
-    time.sleep(2)
-    print(f"{cards_on_table[3].show()}")
-    print(indenture * ' ', end='', flush=True)
-    time.sleep(0.5)
-    print(f"(您的底牌是: {player.down[0].show()}  {player.down[1].show()})")
-    print(indenture * ' ', end='', flush=True)
-
-    bet2 = stake_ready()
-    bet = 0
-    n_bet_round = 0
-    while still_betting(n_bet_round):
-        n_bet_round += 1
-        for i in players:
-            if not i.playing:
-                continue
-            elif active_player_number() == 1:
-                i.win()
-                return  # to end this round
-            elif i.is_allin:
-                continue
-            else:
-                if players.index(i) == player_order:
-                    if stake_ready() == i.stake and bet > 0:
-                        continue
-                    else:
-                        player_choose(i)
-                else:
-                    if stake_ready() > i.stake or (stake_ready() == i.stake and bet == 0):
-                        i.decide()  ###the computer uses Monte-Carlo simulation to make an ultra-rational decision!
-                    elif stake_ready() == i.stake and bet > 0:
-                        continue
+    def slow_print(self, text, **kwargs):
+        slow_print(text, **kwargs)
+        return
+
+    def indent(self):  # set the cursor to the table center
+        print(indenture * ' ', end='', flush=True)
+        return
 
-            bet = stake_ready() - bet2
+    def say(self, text):
+        print(text)
+        return
+
+    def report(self, text):  # what the session measured, shown when it ends
+        print(text)
+        return
 
-    if len([i for i in players if i.playing]) == 0:
+    def ask(self, prompt):
+        return input(prompt)
+
+    def confirm(self, prompt, word, complaint=None):  # wait until the human types word
+        while True:
+            message = self.ask(prompt)
+            if message == word:
+                break
+            elif complaint is not None:
+                self.say(complaint)
         return
 
-    ########################################################## River-Round ################################################################
-    print("""  
+    def event(self, game, event, data):  # the listener that puts the game on the terminal
+        player = game.human
+        i = data.get('player')
+        cards_on_table = game.cards_on_table
+        if event == 'deal':
+            print('')
+            self.slow_print("玩 家 所 剩 筹 码： ")
+            print((indenture - 30) * ' ', end='', flush=True)
+            for p in game.players:
+                print(f"{p.name} ¥{p.money}   ", end='', flush=True)  # inform of each player's remaining chip size
+
+            print("""
+
+          """)
+            self.slow_print("您 抽 到 的 底 牌 是: ")
+            self.indent()
+            self.pause(1.5)
+            print(f"{player.down[0].show()}  ", end='', flush=True)
+            self.pause(1.5)
+            print(f"{player.down[1].show()}")
+            self.go_on()
+        elif event == 'street':
+            if data['street'] == 'blind':
+                print("""                                           
+          """)
+                print(indenture * ' ' + '盲注轮开始下注!')
+                self.indent()
+                return
+            elif data['street'] == 'flop':
+                print("""
           """)
-    slow_print('河 牌 轮 开 始 下 注!')
-    print("""  
+                self.slow_print('翻 牌 轮 开 始 下 注!')
+                print("")
+                self.slow_print("本 次 抽 到 的 翻 牌 是: ")
+                self.indent()
+                self.pause(2)
+                print(f"{cards_on_table[0].show()}  ", end='', flush=True)
+                self.pause(2)
+                print(f"{cards_on_table[1].show()}  ", end='', flush=True)
+                self.pause(2)
+                print(f"{cards_on_table[2].show()}")
+            elif data['street'] == 'turn':
+                print("""                                                   
           """)
+                self.slow_print('转 牌 轮 开 始 下 注！')
+                print("")
+                self.slow_print("本 次 抽 到 的 转 牌 是:")
+                self.indent()
+                print(f"{cards_on_table[0].show()}  {cards_on_table[1].show()}  {cards_on_table[2].show()}  ", end='', flush=True)
+                self.pause(2)
+                print(f"{cards_on_table[3].show()}")
+            else:
+                print("""  
+          """)
+                self.slow_print('河 牌 轮 开 始 下 注!')
+                print("""  
+          """)
+                self.slow_print("本 次 抽 到 的 河 牌 是:")
+                print(
+                    indenture * ' ' + f"{cards_on_table[0].show()}  {cards_on_table[1].show()}  {cards_on_table[2].show()}  {cards_on_table[3].show()}  ",
+                    end='', flush=True)
+                self.pause(2)
+                print(f"{cards_on_table[4].show()}")
+            self.indent()
+            self.pause(0.5)
+            print(f"(您的底牌是: {player.down[0].show()}  {player.down[1].show()})")
+            self.indent()
+        elif event == 'blind':
+            print(f"{game.seat(i)}", end='', flush=True)
+            if data['amount'] == small_blind:
+                print(f"""{i.name} 下小盲注¥{small_blind}...""")
+            else:
+                print(f"""{i.name} 下大盲注¥{small_blind * 2}...""")
+            self.indent()
+        elif event == 'think':
+            print(f"{game.seat(i)}{i.name} 思考中...", end='', flush=True)
+        elif event == 'thought':
+            print('\r' + (20 + indenture) * ' ', flush=True)
+            self.indent()
+        elif event == 'fold':
+            self.action(game, i, "弃牌...")
+        elif event == 'check':
+            self.action(game, i, "过牌...")
+        elif event == 'call':
+            self.action(game, i, f"跟注至 ¥{data['stake']}...")
+        elif event == 'raise':
+            self.action(game, i, f"加注了 ¥{data['amount']}...")
+        elif event == 'allin':
+            self.action(game, i, f"把仅剩的 ¥{data['amount']}筹码 ALL-IN 了 !")
+        elif event == 'runout':  # the hands that are all-in face up, with how they stand before the next cards
+            last_players = data['last_players']
+            odds = runout_odds([[c.id for c in p.down] for p in last_players], [c.id for c in cards_on_table])
+            print('')
+            print(indenture * ' ' + 'ALL-IN! 摊开底牌看胜率:')
+            for p, (win, tie) in zip(last_players, odds):
+                print(indenture * ' ' + f"{p.name} :  {p.down[0].show()}  {p.down[1].show()}    胜 {win:6.1%}   平 {tie:6.1%}")
+                self.pause(0.5)
+            self.indent()
+            self.pause(1.5)
+        elif event == 'showdown':
+            print('')
+            self.confirm("请输入'摊牌'来互看底牌并比大小>>", '摊牌', "输入有误！")  # ready to showdown
+            self.indent()
+
+            # Show the down-cards!
+            print('')
+            self.slow_print('场 上 公 共 牌 为:')
+            print(
+                indenture * ' ' + f"{cards_on_table[0].show()} {cards_on_table[1].show()} {cards_on_table[2].show()} {cards_on_table[3].show()} {cards_on_table[4].show()}")
+            print('')
+            print(indenture * ' ' + '在场玩家的底牌为:')
+            self.indent()
+            for p in data['last_players']:
+                print(f"{p.name} :  ", end='', flush=True)
+                self.pause(1)
+                print(f"{p.down[0].show()}  ", end='', flush=True)
+                self.pause(1)
+                print(f"{p.down[1].show()}")
+                self.indent()
+                self.pause(1)
+            print('')
+        elif event == 'win':
+            self.pause(2)
+            print("""
+              """)
+            print(indenture * ' ' + '§(*￣▽￣*)§')
+            print(indenture * ' ' + f"{i.name} 赢了!")
+            if data['pots'] == 1:
+                print(indenture * ' ' + f"{i.name} 拿走了桌上所有的¥{data['amount']}筹码!")
+            else:
+                print(indenture * ' ' + f"{i.name} 拿走了{pot_name(data['pot'])}的¥{data['amount']}筹码!")
+        elif event == 'split':
+            winners = data['winners']
+            self.pause(2)
+            print(f"""
+               """)
+            print(indenture * ' ' + '🎉🎉🎉🎉🎉🎉')
+            print(f"""
+               """)
+            self.indent()
+            for p in winners:
+                print(f"{p.name}  ", end='', flush=True)
 
-    cards_on_table.extend(pack.rd_draw(1))
-
-    slow_print("本 次 抽 到 的 河 牌 是:")
-    print(
-        indenture * ' ' + f"{cards_on_table[0].show()}  {cards_on_table[1].show()}  {cards_on_table[2].show()}  {cards_on_table[3].show()}  ",
-        end='', flush=True)
-    time.sleep(2)
-    print(f"{cards_on_table[4].show()}")
-    print(indenture * ' ', end='', flush=True)
-    time.sleep(0.5)
-    print(f"(您的底牌是: {player.down[0].show()}  {player.down[1].show()})")
-    print(indenture * ' ', end='', flush=True)
-
-    bet3 = stake_ready()
-    bet = 0
-    n_bet_round = 0
-    while still_betting(n_bet_round):
-        n_bet_round += 1
-        for i in players:
-            if not i.playing:
-                continue
-            elif active_player_number() == 1:
-                i.win()
-                return  # to end this round
-            elif i.is_allin:
-                continue
+            print(f"不相上下！平局！HolyShit")
+            if data['pots'] == 1:
+                print(indenture * ' ' + f"他们{len(winners)}个人平分了桌上所有的¥{data['amount']}筹码!")
             else:
-                if players.index(i) == player_order:
-                    if stake_ready() == i.stake and bet > 0:
-                        continue
-                    else:
-                        player_choose(i)
-                else:
-                    if stake_ready() > i.stake or (stake_ready() == i.stake and bet == 0):
-                        i.decide()  ###the computer uses Monte-Carlo simulation to make an ultra-rational decision!
-                    elif stake_ready() == i.stake and bet > 0:
-                        continue
+                print(indenture * ' ' + f"他们{len(winners)}个人平分了{pot_name(data['pot'])}的¥{data['amount']}筹码!")
+        elif event == 'bug':
+            print('')
+            print('出BUG了！！！')
+        return
+
+    def welcome(self, game):
+        player = game.human
+        players = game.players
+        self.slow_print(f"尊敬 的 {player.name} 您好！  欢迎 莅临 第八届 世界 德扑 大赛 总决赛 !!!")
+        self.slow_print("Designed - and - Coded - by - FelixZhang - from - Shanghai - China - Oct/2024.")
+        self.indent()
+        self.pause(2)
+        print('')
+        self.slow_print("今天 我们 很荣幸 地 邀请 到了 本届 比赛 的 全球 6 强 选手，他们 是:")
+        print('')
+        self.indent()
+        for i in range(6):
+            self.pause(1)
+            print(f"{players[i].name}  ", end='', flush=True)
+        print("""
+          """)
+        self.go_on()
+        print('')
+        self.slow_print("以下 是 本次 比赛 的 简要 规则:")
+        print('')
+        self.slow_print(f"每位 选手 开局 均 持有 ¥ {chipset} 的 筹码。")
+        self.slow_print(f"小 盲注 为 ¥ {small_blind}，大 盲注 为 ¥ {2*small_blind}。")
+        print('')
+        self.slow_print("上述 名单 顺序 即 为 比赛 时 各位 选手 的 下注 顺序， 每局 比赛 结束 后 将 往下 顺移 一位。")
+        print('')
+        self.slow_print("比 赛 开 始 后:")
+        print(indenture * ' ' + "输入 '弃' - 弃牌离场。")
+        print(indenture * ' ' + "输入 '跟' - 跟牌继续。")
+        print(indenture * ' ' + "输入 '加' - 加注，并注明您想额外加注的¥数量。")
+        print(
+            indenture * ' ' + "输入 '信息' - 显示相关信息，如您的底牌、在场玩家数量、场内筹码规模、追平所需筹码、您所剩筹码等。")
+        self.go_on()
+        print("""
+          """)
+        print(indenture * ' ' + '<(￣︶￣)↗[GO!])> 比赛开始!')
+        return
+
+    def go_on(self):  # wait until the human has read on
+        print('')
+        self.confirm("请输入 '好' 来继续游戏>>", '好')
+        self.indent()
+        return
+
+    def action(self, game, person, text):
+        self.slow_print(f"{game.seat(person)} ", indent=0, ending='')
+        print(f"""{person.name} {text}""")
+        self.indent()
+        return
 
-            bet = stake_ready() - bet3
 
-    if len([i for i in players if i.playing]) == 0:
+class InstantRenderer(AnimatedRenderer):
+    def pause(self, seconds):
         return
 
-    ########################################################### Show-Down #########################################################
-    last_players = [i for i in players if i.playing]
+    def slow_print(self, text, **kwargs):
+        slow_print(text, delay=0, **kwargs)
+        return
+
+    def confirm(self, prompt, word, complaint=None):
+        return
 
+
+class JsonRenderer(AnimatedRenderer):
+    def pause(self, seconds):
+        return
+
+    def indent(self):
+        return
+
+    def say(self, text):
+        if text.strip():
+            self.write('message', text=text.strip())
+        return
+
+    def report(self, text):
+        self.write('report', text=text.strip())
+        return
+
+    def ask(self, prompt):
+        self.write('ask', prompt=prompt)
+        return input()
+
+    def confirm(self, prompt, word, complaint=None):
+        return
+
+    def write(self, event, **data):
+        print(json.dumps(dict(event=event, **data), ensure_ascii=False), flush=True)
+        return
+
+    def event(self, game, event, data):
+        fields = {k: json_value(v) for k, v in data.items()}
+        if event == 'deal':
+            fields['down'] = json_value(game.human.down) if game.human is not None else None
+            fields['money'] = {p.name: p.money for p in game.players}
+        elif event == 'showdown' or event == 'runout':
+            fields['hands'] = {p.name: json_value(p.down) for p in data['last_players']}
+        if event == 'runout':
+            odds = runout_odds([[c.id for c in p.down] for p in data['last_players']],
+                               [c.id for c in game.cards_on_table])
+            fields['odds'] = {p.name: list(o) for p, o in zip(data['last_players'], odds)}
+        self.write(event, board=json_value(game.cards_on_table), total_stakes=game.sum_player_stakes(), **fields)
+        return
+
+    def welcome(self, game):
+        self.write('welcome', player=game.human.name, players=json_value(game.players), chipset=chipset,
+                   small_blind=small_blind)
+        return
+
+
+def json_value(value):  # the data of an event as JSON: players by name, cards as shown, estimates by their numbers
+    if isinstance(value, Person):
+        return value.name
+    elif isinstance(value, Card):
+        return value.show()
+    elif isinstance(value, Estimate):
+        return {'wins': value.wins, 'samples': value.samples, 'stderr': value.stderr}
+    elif isinstance(value, (list, tuple)):
+        return [json_value(v) for v in value]
+    return value
+
+
+renderers = {'animated': AnimatedRenderer, 'instant': InstantRenderer, 'json': JsonRenderer}
+# how the game is shown, --render picks another
+renderer = AnimatedRenderer()
+
+
+def player_choose(i):  # ask the human for an action, returned as (command, amount) for Game.act()
+    renderer.say('')
     while True:
-        print('')
-        message = input("请输入'摊牌'来互看底牌并比大小>>")  # ready to showdown
-        if message == '摊牌':
-            print(indenture * ' ', end='', flush=True)
-            break
+        command = renderer.ask(f"'弃'/'跟'/'加'/'信息'>>>")
+
+        if command == '弃':
+            renderer.indent()
+            return 'fold', 0
+        elif command == '跟':
+            renderer.indent()
+            return 'call', 0
+        elif command == '加' and (game.stake_ready() > i.stake or game.n_bet_round == 1):
+            if game.is_someone_allin:
+                renderer.say("已有玩家ALL IN，无法继续加注")
+            else:
+                while True:
+                    message = renderer.ask('您想加注多少¥ ? >>')
+                    try:
+                        a = float(message)
+                        if a % 5 != 0:
+                            renderer.say("输入有误!")
+                        else:
+                            break
+                    except ValueError:
+                        renderer.say("输入有误!")
+                renderer.indent()
+                return 'raise', int(message)
+        elif command == '信息':
+            renderer.say(info(game, i))
         else:
-            print("输入有误！")
+            renderer.say("输入有误!")
 
-    # Show the down-cards!
-    print('')
-    slow_print('场 上 公 共 牌 为:')
-    print(
-        indenture * ' ' + f"{cards_on_table[0].show()} {cards_on_table[1].show()} {cards_on_table[2].show()} {cards_on_table[3].show()} {cards_on_table[4].show()}")
-    print('')
-    print(indenture * ' ' + '在场玩家的底牌为:')
-    print(indenture * ' ', end='', flush=True)
-    for i in last_players:
-        print(f"{i.name} :  ", end='', flush=True)
-        time.sleep(1)
-        print(f"{i.down[0].show()}  ", end='', flush=True)
-        time.sleep(1)
-        print(f"{i.down[1].show()}")
-        print(indenture * ' ', end='', flush=True)
-        time.sleep(1)
 
-    # Find the best composition of 5 cards for each of the remaining players
-    for i in players:
-        if not i.playing:
-            pass
-        else:
-            i.hand = best_5from7(i.down, cards_on_table)
+def pot_name(k):
+    return '主池' if k == 0 else f'边池{k}'
 
-    # Find the winner!
-    last_players_values = [hand_value(i.hand) for i in last_players]
-    max_value = max(last_players_values)
-    winners = [i for i in last_players if hand_value(i.hand) == max_value]
 
-    if len(winners) == 0 or len(winners) > 4:
-        print('')
-        print("出BUG了！！！")
-    elif len(winners) == 1:
-        print('')
-        winners[0].win()
-    else:
-        divided_pot = round((sum_player_stakes() / len(winners)) / 5) * 5
-        for i in range(len(winners)):
-            winners[i].money += divided_pot
+# define YOU
+player = Person("")
+# the table YOU play at
+game = Game([player])
+
+
+##################################### The program jumps here when the player starts a new game ##################################
+def new_game():
+    global player
+    global game
+
+    if num_workers > 1:
+        simulation_pool()  # start the simulation processes before anyone has to think
+
+    zhao, sun, li, zhang, wu = [Person(name) for name in computer_names]
+    myname = renderer.ask("""请输入您的大名 >>""")
+    player = Person(myname)
+    players = [zhao, sun, li, zhang, wu, player]
+    random.shuffle(players)  # randomly determine the order of playing
+    game = Game(players, human=player)
+    game.listeners.append(renderer.event)
+    if hand_history is not None:
+        game.listeners.append(hand_history.listen)
+    if speculative_equity:
+        game.speculation = Speculation()
+    renderer.welcome(game)
+    return
 
-        time.sleep(2)
-        print(f"""
-               """)
-        print(indenture * ' ' + '🎉🎉🎉🎉🎉🎉')
-        print(f"""
-               """)
-        print(indenture * ' ', end='', flush=True)
-        for i in range(len(winners)):
-            print(f"{winners[i].name}  ", end='', flush=True)
 
-        print(f"不相上下！平局！HolyShit")
-        print(indenture * ' ' + f"他们{len(winners)}个人平分了桌上所有的¥{sum_player_stakes()}筹码!")
 
+
+def info(game, player):
+    temp_info = f"""
+  您的底牌 :{player.down[0].show()} {player.down[1].show()}
+在场玩家数量: {game.active_player_number()}
+场内所有筹码: ¥{game.sum_player_stakes()}
+您的在场筹码: ¥{player.stake}
+追平所需筹码: ¥{game.stake_ready() - player.stake}
+您的所剩筹码: ¥{player.money}"""
+    return temp_info
+
+
+############################## the program jumps here when someone has won and goes to the next round ############################
+def new_round():
+    game.start_hand()
+    while game.waiting is not None:
+        command, amount = player_choose(game.waiting)
+        game.act(command, amount)
     return  # End this round of game
 
 
 ######################## The program starts here, all above are definition of classes/ functions/ variables ##################
-new_game()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Texas Hold'em")
+    parser.add_argument('--workers', type=int,
+                        help='processes sharing the Monte Carlo simulations of the computer players')
+    parser.add_argument('--build-preflop-table', action='store_true',
+                        help=f'simulate every preflop hand class against 1-{preflop_max_opponents} opponents, then exit')
+    parser.add_argument('--think-ms', type=float,
+                        help='milliseconds a computer player may spend on a winning rate, however fast the machine')
+    parser.add_argument('--seed', type=int, help='seed of the game, which makes every deal and decision repeatable')
+    parser.add_argument('--tournament', type=int, metavar='TABLES',
+                        help='play this many tables of computer players on --workers processes, then exit')
+    parser.add_argument('--tune', action='store_true',
+                        help='search the style of the computer players by self-play on all cores, save it, then exit')
+    parser.add_argument('--benchmark', nargs='?', const='', metavar='FILTER',
+                        help='time the evaluators, winning rates, decisions and hands (those whose name holds FILTER),'
+                             ' compare them with benchmark_baseline.json, then exit; fails if any got slower')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='with --benchmark, keep its results as the baseline of later runs')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='write every winning rate, decision and street as a JSON line to FILE, and show how long'
+                             ' each kind took when the session ends')
+    parser.add_argument('--profile', nargs='?', const='profile.txt', metavar='FILE',
+                        help='profile the session and write where the time went to FILE (profile.txt)')
+    parser.add_argument('--server', type=int, nargs='?', const=server_port, metavar='PORT',
+                        help=f'host a table for every client that connects to {server_host}:PORT ({server_port})')
+    parser.add_argument('--render', choices=sorted(renderers), default='animated',
+                        help="how the game is shown: 'animated' as it was written, 'instant' without any pause,"
+                             " 'json' as one JSON line per event")
+    parser.add_argument('--history', metavar='FILE',
+                        help='append every hand played (by the tournament, the server or you) to FILE')
+    parser.add_argument('--replay', metavar='FILE',
+                        help='play every hand of the history FILE through the game again, check it ends the same,'
+                             ' then exit')
+    args = parser.parse_args()
+    if args.metrics is not None:
+        start_metrics(args.metrics)
+    if args.profile is not None:
+        profiler = cProfile.Profile()
+        atexit.register(write_profile, profiler, args.profile)
+        profiler.enable()
+    if args.workers is not None:
+        num_workers = args.workers
+    load_strategy()  # the style found by --tune, if any
+    if args.think_ms is not None:
+        decision_time_budget = args.think_ms / 1000
+    if args.seed is not None:
+        random.seed(args.seed)
+        speculative_equity = False  # a repeatable game can't depend on how long the human takes to type
+
+    if args.build_preflop_table:
+        build_preflop_table()
+        raise SystemExit
+    if args.replay is not None:
+        raise SystemExit(0 if replay_history(args.replay) else 1)
+    if args.tournament:
+        run_tournament(args.tournament, args.seed if args.seed is not None else 0, num_workers, history=args.history)
+        raise SystemExit
+    if args.history is not None:
+        hand_history = HandHistory(args.history)
+    if args.tune:
+        tune_strategy(args.seed if args.seed is not None else 0, args.workers or os.cpu_count())
+        raise SystemExit
+    if args.benchmark is not None:
+        raise SystemExit(0 if benchmark(args.benchmark, args.save_baseline) else 1)
+    if args.server is not None:
+        run_server(args.server)
+        raise SystemExit
+
+    renderer = renderers[args.render]()
+    try:
+        new_game()
 
-while True:
-
-    new_round()  # play a round of game
-    temp = players.copy()
-    temp.remove(player)
-    num_other_active_players = len([p for p in temp if p.money > 2 * small_blind])
-    if player.money > 0 and num_other_active_players > 0:
         while True:
-            msg = input("请输入 '继续' 来进入下一局游戏>>")
-            if msg == '继续':
-                break
+
+            new_round()  # play a round of game
+            temp = game.players.copy()
+            temp.remove(player)
+            num_other_active_players = len([p for p in temp if p.money > 2 * small_blind])
+            if player.money > 0 and num_other_active_players > 0:
+                renderer.confirm("请输入 '继续' 来进入下一局游戏>>", '继续', "输入有误!")
             else:
-                print("输入有误!")
-    else:
-        if player.money == 0:
-            print(f"""
+                if player.money == 0:
+                    renderer.say(f"""
 
-                   """)
-            print(indenture * ' ' + "你输光了！！！")
-        elif player.money > 0 and num_other_active_players == 0:
+                           """)
+                    renderer.say(indenture * ' ' + "你输光了！！！")
+                elif player.money > 0 and num_other_active_players == 0:
 
-            print(f"""
+                    renderer.say(f"""
 
-                   """)
-            print(indenture * ' ' + f"恭喜{player.name} 获得了本届比赛的总冠军！")
-        while True:
-            msg = input("请输入 '新游戏' 来启动新游戏>>")
-            if msg == '新游戏':
+                           """)
+                    renderer.say(indenture * ' ' + f"恭喜{player.name} 获得了本届比赛的总冠军！")
+                renderer.confirm("请输入 '新游戏' 来启动新游戏>>", '新游戏')
                 new_game()  ## go to start a new game
-                break
-            else:
-                pass
+    except EOFError:  # a scripted game has run out of input
+        raise SystemExit
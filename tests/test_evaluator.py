@@ -0,0 +1,76 @@
+import importlib.util
+import itertools
+import os
+import random
+
+import pytest
+
+PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Texas-Holdem-FelixZhang.py')
+
+
+@pytest.fixture(scope='module')
+def holdem():
+    spec = importlib.util.spec_from_file_location('holdem', PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def cards(holdem, *names):
+    return [holdem.Card(name[0], name[1:]) for name in names]
+
+
+def best_value(holdem, hand):  # what the fast evaluators must agree with: the best hand_value of the 21 five cards
+    return max(holdem.hand_value(list(five)) for five in itertools.combinations(hand, 5))
+
+
+def numpy_scores(holdem, hands):
+    if holdem.np is None:
+        pytest.skip('numpy is not installed')
+    ids = holdem.np.array([[c.id for c in hand] for hand in hands])
+    return [int(score) for score in holdem.evaluate_7_numpy(ids[:, None, :2], ids[:, 2:])[:, 0]]
+
+
+def assert_same_order(values, scores):  # scores rank the hands exactly as values do, ties included
+    for (v1, s1), (v2, s2) in itertools.combinations(zip(values, scores), 2):
+        assert (v1 > v2) == (s1 > s2) and (v1 == v2) == (s1 == s2)
+
+
+special_hands = {  # name -> (7 cards, the category hand_value gives their best 5)
+    'wheel': (('♥A', '♠2', '♦3', '♣4', '♥5', '♠9', '♦J'), 3),
+    'suited wheel': (('♥A', '♥2', '♥3', '♥4', '♥5', '♠9', '♦J'), 8),  # hand_value's quirk: a royal flush
+    'straight flush': (('♠5', '♠6', '♠7', '♠8', '♠9', '♥9', '♦K'), 7),
+    'flush': (('♦2', '♦6', '♦9', '♦J', '♦K', '♣10', '♠Q'), 4),
+    'straight': (('♣9', '♦10', '♥J', '♠Q', '♣K', '♥2', '♥3'), 3),
+    'flush and straight': (('♦9', '♦10', '♥J', '♦Q', '♦K', '♦3', '♣A'), 4),
+}
+
+
+@pytest.fixture(scope='module')
+def hands(holdem):
+    rng = random.Random(2024)
+    dealt = [rng.sample(holdem.all_cards, 7) for _ in range(400)]
+    return [cards(holdem, *hand) for hand, category in special_hands.values()] + dealt
+
+
+def test_evaluate_7_orders_like_hand_value(holdem, hands):
+    values = [best_value(holdem, hand) for hand in hands]
+    assert_same_order(values, [holdem.evaluate_7([c.id for c in hand]) for hand in hands])
+
+
+def test_evaluate_7_numpy_orders_like_hand_value(holdem, hands):
+    values = [best_value(holdem, hand) for hand in hands]
+    assert_same_order(values, numpy_scores(holdem, hands))
+
+
+@pytest.mark.parametrize('name', sorted(special_hands))
+def test_special_hands(holdem, name):
+    names, category = special_hands[name]
+    hand = cards(holdem, *names)
+    assert best_value(holdem, hand)[0] == category
+    score = holdem.evaluate_7([c.id for c in hand])
+    assert numpy_scores(holdem, [hand]) == [score]
+    for other, other_category in special_hands.values():  # against every other special hand
+        other = cards(holdem, *other)
+        assert_same_order([best_value(holdem, hand), best_value(holdem, other)],
+                          [score, holdem.evaluate_7([c.id for c in other])])
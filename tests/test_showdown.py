@@ -0,0 +1,52 @@
+import importlib.util
+import os
+
+import pytest
+
+PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Texas-Holdem-FelixZhang.py')
+
+
+@pytest.fixture(scope='module')
+def holdem():
+    spec = importlib.util.spec_from_file_location('holdem', PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def cards(holdem, *names):
+    return [holdem.Card(name[0], name[1:]) for name in names]
+
+
+@pytest.mark.parametrize('num_players', [5, 6, 10])
+def test_board_that_plays_splits_the_pot(holdem, num_players):
+    players = [holdem.Person(f"{k + 1}") for k in range(num_players)]
+    game = holdem.Game(players)
+    game.cards_on_table = cards(holdem, '♥A', '♠K', '♦Q', '♣J', '♥10')  # a straight no down card can beat
+    low = cards(holdem, '♠2', '♦2', '♣2', '♠3', '♦3', '♣3', '♠4', '♦4', '♣4', '♠5', '♦5', '♣5', '♠6', '♦6', '♣6',
+                '♠7', '♦7', '♣7', '♠8', '♦8')
+    for k, p in enumerate(players):
+        p.down = low[2 * k:2 * k + 2]
+        p.stake = 100
+        p.money = 0
+    game.table.reset(players)
+    events = []
+    game.listeners.append(lambda game, event, data: events.append(event))
+    game.showdown()
+    assert sum(p.money for p in players) == 100 * num_players
+    assert 'bug' not in events and events.count('split') == 1
+
+
+def test_side_pots_keep_every_chip(holdem):
+    players = [holdem.Person(name) for name in 'ABCD']
+    game = holdem.Game(players)
+    game.cards_on_table = cards(holdem, '♣2', '♦7', '♥9', '♠J', '♣4')
+    downs = [('♣A', '♦A'), ('♣K', '♦K'), ('♣Q', '♦Q'), ('♥5', '♥6')]
+    for p, down, stake in zip(players, downs, (100, 300, 500, 200)):
+        p.down = cards(holdem, *down)
+        p.stake = stake
+        p.money = 0
+    players[3].playing = False
+    game.table.reset(players)
+    game.showdown()
+    assert [p.money for p in players] == [400, 500, 200, 0]